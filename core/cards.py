@@ -0,0 +1,36 @@
+"""
+Queryset compartido para las tarjetas de tweet de todos los feeds.
+
+``components/tweet_card.html`` lee el autor, su avatar, el tweet original
+(citas/retuits) con su autor, el tweet citado si el retuit es de una cita y
+si el visitante ya dio like. Todo eso se trae aquí en una sola consulta por
+página, sin importar cuántas tarjetas haya.
+"""
+from django.db.models import Case, Exists, F, OuterRef, When
+
+from .models import Like, Tweet
+
+CARD_RELATED = ('user__userprofile', 'parent__user__userprofile', 'parent__parent__user__userprofile')
+
+
+def tweet_cards(queryset=None, viewer=None):
+    """Aplica a ``queryset`` (por defecto todos los tweets) lo que la tarjeta necesita."""
+    qs = Tweet.objects.all() if queryset is None else queryset
+    qs = qs.select_related(*CARD_RELATED)
+    if viewer is not None and viewer.is_authenticated:
+        # El like de un retuit es el del original, que es lo que muestra la tarjeta
+        qs = qs.alias(shown_id=Case(When(is_retweet=True, then=F('parent_id')), default=F('pk')))
+        qs = qs.annotate(liked_by_me=Exists(Like.objects.filter(user=viewer, tweet=OuterRef('shown_id'))))
+    return qs
+
+
+def cards_for_ids(ids, viewer=None):
+    """Tarjetas para ``ids`` respetando su orden (para los feeds materializados)."""
+    found = tweet_cards(Tweet.objects.filter(pk__in=ids), viewer).in_bulk()
+    return [found[pk] for pk in ids if pk in found]
+
+
+async def acards_for_ids(ids, viewer=None):
+    """``cards_for_ids`` con el ORM async."""
+    found = await tweet_cards(Tweet.objects.filter(pk__in=ids), viewer).ain_bulk()
+    return [found[pk] for pk in ids if pk in found]
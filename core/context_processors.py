@@ -0,0 +1,12 @@
+from django.utils.functional import SimpleLazyObject
+
+from . import notifications
+
+
+def unread_notifications(request):
+    """Badge de notificaciones sin leer (del caché; solo se calcula si la plantilla lo usa)."""
+    def count():
+        user = getattr(request, 'user', None)
+        return notifications.unread_count(user) if user is not None and user.is_authenticated else 0
+
+    return {'unread_notifications': SimpleLazyObject(count)}
@@ -0,0 +1,76 @@
+"""
+Contadores denormalizados de ``Tweet`` (likes, comentarios y retuits) y de
+``Coleccion`` (tweets guardados).
+
+Las vistas actualizan los de ``Tweet`` con expresiones ``F()`` para que el
+incremento sea atómico en la base de datos; el de ``Coleccion`` lo recalcula
+la señal ``m2m_changed`` con ``recount_colecciones()``. Este módulo calcula
+los valores reales para corregir desfases en lote.
+"""
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Coleccion, Comment, Like, Tweet
+
+COUNTERS = ('like_count', 'comment_count', 'retweet_count')
+
+
+def _count(model, fk, **filters):
+    rows = model.objects.filter(**{fk: OuterRef('pk')}, **filters).order_by().values(fk).annotate(n=Count('*')).values('n')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def real_counts():
+    """Expresiones que calculan cada contador desde las tablas origen."""
+    return {
+        'like_count': _count(Like, 'tweet'),
+        'comment_count': _count(Comment, 'tweet'),
+        'retweet_count': _count(Tweet, 'parent', is_retweet=True),
+    }
+
+
+def coleccion_count():
+    """Expresión con el número real de tweets guardados en cada colección."""
+    return _count(Coleccion.tweets.through, 'coleccion')
+
+
+def recount_colecciones(ids):
+    """Recalcula ``tweet_count`` de las colecciones ``ids`` con un solo UPDATE."""
+    if ids:
+        Coleccion.objects.filter(pk__in=ids).update(tweet_count=coleccion_count())
+
+
+def reconcile_colecciones():
+    """Corrige las colecciones desfasadas; devuelve ``(revisadas, corregidas)``."""
+    rows = Coleccion.objects.annotate(real=coleccion_count()).values_list('pk', 'tweet_count', 'real')
+    drifted = [pk for pk, stored, real in rows if stored != real]
+    recount_colecciones(drifted)
+    return len(rows), len(drifted)
+
+
+def with_real_counts(queryset):
+    """Anota ``real_<contador>`` con el valor calculado desde las tablas origen."""
+    return queryset.annotate(**{f'real_{name}': expr for name, expr in real_counts().items()})
+
+
+def reconcile(batch_size=1000):
+    """
+    Recorre ``Tweet`` por rangos de id y corrige los contadores desfasados.
+    Devuelve ``(revisados, corregidos)``.
+    """
+    real = [f'real_{name}' for name in COUNTERS]
+    checked = fixed = 0
+    last_pk = 0
+    while True:
+        rows = list(with_real_counts(Tweet.objects.filter(pk__gt=last_pk).order_by('pk'))
+                    .values_list('pk', *COUNTERS, *real)[:batch_size])
+        if not rows:
+            return checked, fixed
+        n = len(COUNTERS)
+        drifted = [row[0] for row in rows if row[1:1 + n] != row[1 + n:]]
+        if drifted:
+            # Un solo UPDATE con subconsultas para todo el lote desfasado
+            Tweet.objects.filter(pk__in=drifted).update(**real_counts())
+        checked += len(rows)
+        fixed += len(drifted)
+        last_pk = rows[-1][0]
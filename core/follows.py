@@ -0,0 +1,76 @@
+"""
+Grafo de seguidores en caché.
+
+Para cada usuario se guardan en el caché dos conjuntos de ids: a quién sigue
+(``follow:out:<id>``) y quién lo sigue (``follow:in:<id>``). Las vistas
+preguntan aquí en lugar de ir a ``Follow`` en cada petición.
+
+Al seguir o dejar de seguir (señales de ``Follow``) se parchea el conjunto del
+que sigue, que solo cambia por sus propias acciones, y se invalida el del
+seguido, que pueden cambiar muchos a la vez y se vuelve a leer completo.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow
+
+FOLLOW_TIMEOUT = getattr(settings, 'TWITTOR_FOLLOW_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def _following_key(user_id):
+    return f'follow:out:{user_id}'
+
+
+def _followers_key(user_id):
+    return f'follow:in:{user_id}'
+
+
+def _cached(key, rows):
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(rows)
+        cache.set(key, ids, FOLLOW_TIMEOUT)
+    return ids
+
+
+def following_ids(user_id):
+    """Ids de las cuentas que sigue ``user_id``."""
+    return _cached(_following_key(user_id), Follow.objects.filter(follower_id=user_id).values_list('following_id', flat=True))
+
+
+def follower_ids(user_id):
+    """Ids de las cuentas que siguen a ``user_id``."""
+    return _cached(_followers_key(user_id), Follow.objects.filter(following_id=user_id).values_list('follower_id', flat=True))
+
+
+def counts(user_id):
+    """``{'followers': n, 'following': m}`` de ``user_id``."""
+    return {'followers': len(follower_ids(user_id)), 'following': len(following_ids(user_id))}
+
+
+def is_following(viewer_id, author_id):
+    return author_id in following_ids(viewer_id)
+
+
+def followed_among(viewer_id, author_ids):
+    """De ``author_ids``, los que ``viewer_id`` sigue (una sola lectura del caché)."""
+    return following_ids(viewer_id).intersection(author_ids)
+
+
+def _patch(follower_id, following_id, add):
+    key = _following_key(follower_id)
+    ids = cache.get(key)
+    if ids is not None:
+        cache.set(key, ids | {following_id} if add else ids - {following_id}, FOLLOW_TIMEOUT)
+    cache.delete(_followers_key(following_id))
+
+
+def followed(follower_id, following_id):
+    """Actualiza el caché cuando la transacción que creó el ``Follow`` confirma."""
+    transaction.on_commit(lambda: _patch(follower_id, following_id, add=True))
+
+
+def unfollowed(follower_id, following_id):
+    """Actualiza el caché cuando la transacción que borró el ``Follow`` confirma."""
+    transaction.on_commit(lambda: _patch(follower_id, following_id, add=False))
@@ -0,0 +1,137 @@
+"""
+Caché de tarjetas de tweet ya renderizadas.
+
+Cada tarjeta se guarda con una clave que incluye la versión del tweet, la de
+su autor y (si es cita/retuit) la del tweet original y su autor. Un retuit
+es una fila sin texto: su tarjeta muestra el original (y, si el original es
+una cita, también el tweet citado). Las señales
+y las vistas cambian la versión cuando algo visible cambia (likes, ediciones,
+perfil/avatar, borrado), así que nunca hay que borrar fragmentos viejos:
+simplemente dejan de pedirse y caducan. Las versiones también caducan
+(``TWITTOR_CARD_VERSION_TIMEOUT``), para que los workers que no comparten
+caché vean los cambios de los demás.
+
+Lo que depende del visitante (token CSRF y si ya dio like) se deja como
+marcador en el fragmento y se rellena en cada petición.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = 'components/tweet_card.html'
+CARD_TIMEOUT = getattr(settings, 'TWITTOR_CARD_CACHE_TIMEOUT', 60 * 60 * 24)
+# Las versiones caducan: con un caché por proceso (LocMem) y varios workers, un
+# cambio hecho en otro proceso se ve a lo sumo así de tarde. Con un caché
+# compartido (Redis, Memcached) se puede subir o poner None.
+VERSION_TIMEOUT = getattr(settings, 'TWITTOR_CARD_VERSION_TIMEOUT', 60)
+
+CSRF_PLACEHOLDER = '@@csrf@@'
+LIKED_PLACEHOLDER = '@@liked@@'
+LIKED_CLASSES = ' text-red-600 border-red-300'
+LIKE_NEXT_PLACEHOLDER = '@@like-next@@'
+
+
+def _tweet_key(tweet_id):
+    return f'card:v:t:{tweet_id}'
+
+
+def _user_key(user_id):
+    return f'card:v:u:{user_id}'
+
+
+def _new_version():
+    return time.time_ns()
+
+
+def bump_tweet(tweet_id):
+    """Invalida la tarjeta del tweet (y las de las citas/retuits que lo muestran)."""
+    cache.set(_tweet_key(tweet_id), _new_version(), VERSION_TIMEOUT)
+
+
+def bump_user(user_id):
+    """Invalida todas las tarjetas de un autor (cambio de perfil, avatar o username)."""
+    cache.set(_user_key(user_id), _new_version(), VERSION_TIMEOUT)
+
+
+def _shown(t):
+    """El tweet que muestra la tarjeta: un retuit muestra el original."""
+    return t.parent if t.is_retweet and t.parent_id else t
+
+
+def _involved(t):
+    """Tweets cuyo cambio invalida la tarjeta: el propio, el original y, si es retuit de una cita, el citado."""
+    yield t
+    if t.parent_id:
+        yield t.parent
+        if t.is_retweet and t.parent.parent_id:
+            yield t.parent.parent
+
+
+def _versions(tweets):
+    """Versiones de todos los tweets y autores involucrados, con un solo get_many."""
+    keys = set()
+    for t in tweets:
+        for related in _involved(t):
+            keys.update((_tweet_key(related.pk), _user_key(related.user_id)))
+    versions = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys - versions.keys()}
+    if missing:
+        cache.set_many(missing, VERSION_TIMEOUT)
+        versions.update(missing)
+    return versions
+
+
+def _card_key(t, versions):
+    parts = [f'card:{t.pk}']
+    for related in _involved(t):
+        parts += [versions[_tweet_key(related.pk)], versions[_user_key(related.user_id)]]
+    return ':'.join(str(p) for p in parts)
+
+
+def cached_cards(tweets):
+    """HTML de cada tarjeta con los marcadores sin rellenar, leyendo del caché lo que se pueda."""
+    tweets = list(tweets)
+    if not tweets:
+        return []
+    versions = _versions(tweets)
+    keys = [_card_key(t, versions) for t in tweets]
+    cached = cache.get_many(keys)
+
+    fresh = {}
+    for t, key in zip(tweets, keys):
+        if key not in cached:
+            fresh[key] = render_to_string(CARD_TEMPLATE, {
+                't': _shown(t),
+                'retweeted_by': t.user if t.is_retweet else None,
+                'csrf_token': CSRF_PLACEHOLDER,
+                'liked_placeholder': LIKED_PLACEHOLDER,
+                'like_next_placeholder': LIKE_NEXT_PLACEHOLDER,
+            })
+    if fresh:
+        cache.set_many(fresh, CARD_TIMEOUT)
+        cached.update(fresh)
+    return [cached[key] for key in keys]
+
+
+def fill(html, token, liked=False):
+    """Rellena los marcadores de una tarjeta para un visitante."""
+    return (
+        html.replace(CSRF_PLACEHOLDER, token)
+        .replace(LIKED_PLACEHOLDER, LIKED_CLASSES if liked else '')
+        .replace(LIKE_NEXT_PLACEHOLDER, '0' if liked else '1')
+    )
+
+
+def render_cards(tweets, request):
+    """HTML de las tarjetas de ``tweets`` leyendo del caché lo que se pueda."""
+    tweets = list(tweets)
+    if not tweets:
+        return ''
+    token = get_token(request)
+    return mark_safe(''.join(
+        fill(html, token, getattr(t, 'liked_by_me', False)) for t, html in zip(tweets, cached_cards(tweets))
+    ))
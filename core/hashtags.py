@@ -0,0 +1,62 @@
+"""
+Índice de hashtags escrito al publicar.
+
+Los hashtags se extraen con ``HASHTAG_RE`` y se guardan normalizados en
+``Hashtag``/``TweetHashtag``. La página de una etiqueta se vuelve una búsqueda
+exacta por índice en lugar de ``content__icontains``.
+"""
+import re
+
+from .models import Hashtag, Tweet, TweetHashtag
+
+HASHTAG_RE = re.compile(r"(#\w+)")
+
+
+def normalize(tag):
+    """``'#Django'`` o ``'Django'`` → ``'django'``."""
+    return tag.lstrip('#').casefold()
+
+
+def extract(text):
+    """Hashtags normalizados (sin repetir) que aparecen en ``text``."""
+    return {normalize(m) for m in HASHTAG_RE.findall(text or '')}
+
+
+def index_tweets(tweets):
+    """Registra los hashtags de varios tweets con unas pocas consultas."""
+    tags_by_tweet = {tw: extract(tw.content) for tw in tweets}
+    names = set().union(*tags_by_tweet.values())
+    if not names:
+        return
+    Hashtag.objects.bulk_create([Hashtag(name=name) for name in names], ignore_conflicts=True)
+    ids = dict(Hashtag.objects.filter(name__in=names).values_list('name', 'id'))
+    TweetHashtag.objects.bulk_create(
+        [
+            TweetHashtag(hashtag_id=ids[name], tweet_id=tw.pk, created_at=tw.created_at)
+            for tw, tags in tags_by_tweet.items()
+            for name in tags
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def backfill(chunk_size=2000):
+    """Indexa todos los tweets existentes recorriéndolos por rangos de id."""
+    done = 0
+    last_pk = 0
+    while True:
+        chunk = list(Tweet.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'content', 'created_at')[:chunk_size])
+        if not chunk:
+            return done
+        index_tweets(chunk)
+        done += len(chunk)
+        last_pk = chunk[-1].pk
+
+
+def tagged(tag):
+    """Entradas del índice para ``tag``, de la más reciente a la más antigua."""
+    return (
+        TweetHashtag.objects.filter(hashtag__name=normalize(tag))
+        .order_by('-created_at', '-tweet_id')
+        .only('created_at', 'tweet_id')
+    )
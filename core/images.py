@@ -0,0 +1,153 @@
+"""
+Variantes redimensionadas de imágenes de tweets y avatares.
+
+Al subir una imagen se encarga a un pool de procesos la generación de copias
+WebP y JPEG en varios anchos, guardadas junto al original::
+
+    tweets/foto.png  →  tweets/foto.png.320w.webp, tweets/foto.png.320w.jpg, ...
+
+Cuando terminan se marca ``<campo>_derived`` en el modelo y se invalida la
+tarjeta cacheada; desde ese momento las plantillas usan ``{% picture %}`` con
+``srcset`` en lugar del original a tamaño completo.
+"""
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Anchos generados por campo y el ``sizes`` por defecto de cada uno
+WIDTHS = {
+    'avatar': (40, 80, 160),
+    'image': (320, 640, 1280),
+}
+SIZES = {
+    'avatar': '40px',
+    'image': '(max-width: 672px) 100vw, 672px',
+}
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+_pool = None
+
+
+def variant_name(name, width, ext):
+    """``'tweets/foto.png'`` → ``'tweets/foto.png.640w.webp'``."""
+    # Con la extensión original: foto.png y foto.jpg no comparten variantes
+    return f'{name}.{width}w.{ext}'
+
+
+def srcset(file, field, ext):
+    """``srcset`` con todas las variantes de ``file`` en el formato ``ext``."""
+    return ', '.join(
+        f'{default_storage.url(variant_name(file.name, width, ext))} {width}w' for width in WIDTHS[field]
+    )
+
+
+def fallback_url(file, field):
+    """Variante JPEG intermedia para el ``src`` de navegadores sin ``srcset``."""
+    widths = WIDTHS[field]
+    return default_storage.url(variant_name(file.name, widths[len(widths) // 2], 'jpg'))
+
+
+def render_variants(path, field):
+    """
+    Genera las variantes del archivo ``path``. Se ejecuta en el pool de
+    procesos, así que solo recibe y devuelve datos simples.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode in ('RGBA', 'LA', 'P'):
+            # JPEG no tiene transparencia: se aplana sobre blanco
+            rgba = original.convert('RGBA')
+            rgb = Image.new('RGB', rgba.size, 'white')
+            rgb.paste(rgba, mask=rgba.getchannel('A'))
+        else:
+            rgb = original.convert('RGB')
+        written = []
+        for width in WIDTHS[field]:
+            if field == 'avatar':
+                resized = ImageOps.fit(rgb, (width, width), Image.LANCZOS)
+            else:
+                resized = rgb.copy()
+                resized.thumbnail((width, width * 4), Image.LANCZOS)  # nunca agranda
+            for ext, options in FORMATS.items():
+                target = variant_name(path, width, ext)
+                resized.save(target, **options)
+                written.append(target)
+    return written
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=getattr(settings, 'TWITTOR_IMAGE_WORKERS', 2))
+    return _pool
+
+
+def _mark_ready(model, pk, field, name, bump):
+    # Filtrar por nombre evita marcar como lista una imagen que ya se reemplazó
+    model.objects.filter(pk=pk, **{field: name}).update(**{f'{field}_derived': True})
+    bump()
+
+
+def _done(model, pk, field, name, bump, submitter, future):
+    try:
+        future.result()
+        _mark_ready(model, pk, field, name, bump)
+    except Exception:
+        logger.exception('No se pudieron generar las variantes de %s', name)
+    finally:
+        # Normalmente corre en el hilo del pool: no dejar su conexión abierta
+        # (si el futuro ya había terminado corre en la petición y no se toca)
+        if threading.get_ident() != submitter:
+            connection.close()
+
+
+def schedule(instance, field, bump):
+    """
+    Encola la generación de variantes del ``field`` de ``instance`` cuando la
+    transacción confirma. ``bump`` invalida las tarjetas que muestran la imagen.
+    """
+    name = getattr(instance, field).name
+    model, pk = type(instance), instance.pk
+
+    def submit():
+        path = default_storage.path(name)
+        if not getattr(settings, 'TWITTOR_IMAGE_ASYNC', True):
+            render_variants(path, field)
+            _mark_ready(model, pk, field, name, bump)
+            return
+        future = _get_pool().submit(render_variants, path, field)
+        future.add_done_callback(partial(_done, model, pk, field, name, bump, threading.get_ident()))
+
+    transaction.on_commit(submit)
+
+
+def build(items, workers=None):
+    """
+    Genera en paralelo las variantes de ``items`` (pares ``(nombre, campo)``)
+    y devuelve los nombres que terminaron bien. Lo usa el comando de backfill.
+    """
+    if not items:
+        return []
+    jobs = [(default_storage.path(name), field) for name, field in items]
+    done = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_variants, path, field) for path, field in jobs]
+        for (name, _), future in zip(items, futures):
+            try:
+                future.result()
+                done.append(name)
+            except Exception:
+                logger.exception('No se pudieron generar las variantes de %s', name)
+    return done
@@ -0,0 +1,80 @@
+"""
+Likes atómicos.
+
+``set_like()`` inserta o borra el like y ajusta ``Tweet.like_count`` en una
+sola transacción con dos sentencias, y devuelve el estado y el contador
+nuevos (sin volver a leer el tweet ni contar likes):
+
+- el INSERT ignora el conflicto con ``unique_together``, así que dos clics
+  simultáneos nunca dan ``IntegrityError``;
+- el contador solo se mueve si el INSERT/DELETE afectó una fila, así que
+  nunca se desfasa de la tabla de likes;
+- con ``liked=True/False`` la operación es idempotente: el botón manda el
+  estado que quiere y un doble clic no vuelve a alternar.
+"""
+from collections import namedtuple
+
+from django.db import connections, router, transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+from .models import Like, Tweet
+
+LikeResult = namedtuple('LikeResult', 'liked changed like_count author_id')
+
+
+def _insert(connection, user_id, tweet_id):
+    ops = connection.ops
+    sql = (
+        f"{ops.insert_statement(on_conflict=OnConflict.IGNORE)} {Like._meta.db_table} "
+        f"(user_id, tweet_id, created_at) VALUES (%s, %s, %s) "
+        f"{ops.on_conflict_suffix_sql([], OnConflict.IGNORE, [], [])}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, tweet_id, timezone.now()])
+        return cursor.rowcount == 1
+
+
+def _delete(connection, user_id, tweet_id):
+    deleted, _ = Like.objects.using(connection.alias).filter(user_id=user_id, tweet_id=tweet_id).delete()
+    return deleted == 1
+
+
+def _bump_count(connection, tweet_id, delta):
+    """Suma ``delta`` al contador y devuelve ``(like_count, user_id)``, o ``None`` si el tweet no existe."""
+    table = Tweet._meta.db_table
+    with connection.cursor() as cursor:
+        if not delta:
+            cursor.execute(f'SELECT like_count, user_id FROM {table} WHERE id = %s', [tweet_id])
+        elif connection.features.can_return_columns_from_insert:
+            # SQLite ≥ 3.35 y PostgreSQL: el UPDATE devuelve el valor nuevo
+            cursor.execute(
+                f'UPDATE {table} SET like_count = like_count + %s WHERE id = %s RETURNING like_count, user_id',
+                [delta, tweet_id],
+            )
+        else:
+            cursor.execute(f'UPDATE {table} SET like_count = like_count + %s WHERE id = %s', [delta, tweet_id])
+            cursor.execute(f'SELECT like_count, user_id FROM {table} WHERE id = %s', [tweet_id])
+        return cursor.fetchone()
+
+
+def set_like(user_id, tweet_id, liked=None):
+    """
+    Deja el like de ``user_id`` en ``tweet_id`` en ``liked`` (``None`` alterna).
+    Devuelve un ``LikeResult``; lanza ``Tweet.DoesNotExist`` si el tweet no existe.
+    """
+    # Por el router, como el ORM: así core.routers sabe que la petición escribió
+    # y StickyPrimaryMiddleware fija el primario para las lecturas siguientes
+    connection = connections[router.db_for_write(Like)]
+    with transaction.atomic(using=connection.alias):
+        if liked is None:
+            changed = _delete(connection, user_id, tweet_id)
+            liked = not changed
+            if liked:
+                changed = _insert(connection, user_id, tweet_id)
+        else:
+            changed = _insert(connection, user_id, tweet_id) if liked else _delete(connection, user_id, tweet_id)
+        row = _bump_count(connection, tweet_id, (1 if liked else -1) if changed else 0)
+        if row is None:
+            raise Tweet.DoesNotExist(tweet_id)
+    return LikeResult(liked, changed, *row)
@@ -0,0 +1,58 @@
+"""
+Feeds materializados de las listas.
+
+Igual que el timeline del inicio (``core.timelines``): cada tweet nuevo de un
+miembro se copia al feed de las listas a las que pertenece, y agregar o quitar
+un miembro agrega o quita sus tweets. Leer una lista es un recorrido por el
+índice ``(lista, -created_at)`` de ``ListaFeedEntry``.
+"""
+from django.db import transaction
+
+from .models import ListaFeedEntry, MiembroDeLista
+from .timelines import BATCH_SIZE, copy_tweets
+
+
+def fan_out(tweet):
+    """Agrega el tweet al feed de cada lista en la que está su autor."""
+    lista_ids = MiembroDeLista.objects.filter(usuario_id=tweet.user_id).values_list('lista_id', flat=True)
+    ListaFeedEntry.objects.bulk_create(
+        [
+            ListaFeedEntry(lista_id=lista_id, tweet_id=tweet.pk, author_id=tweet.user_id, created_at=tweet.created_at)
+            for lista_id in lista_ids
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def merge_member(lista_id, user_id):
+    """Copia los tweets de ``user_id`` al feed de la lista (al agregarlo)."""
+    copy_tweets(ListaFeedEntry, 'lista_id', lista_id, 'user_id = %s', [user_id])
+
+
+def evict_member(lista_id, user_id):
+    """Quita los tweets de ``user_id`` del feed de la lista (al quitarlo)."""
+    ListaFeedEntry.objects.filter(lista_id=lista_id, author_id=user_id).delete()
+
+
+def backfill(lista_id):
+    """Completa el feed de una lista con los tweets de todos sus miembros."""
+    copy_tweets(
+        ListaFeedEntry,
+        'lista_id',
+        lista_id,
+        f'user_id IN (SELECT usuario_id FROM {MiembroDeLista._meta.db_table} WHERE lista_id = %s)',
+        [lista_id],
+    )
+
+
+def rebuild(lista_id):
+    """Borra y vuelve a construir el feed de una lista."""
+    with transaction.atomic():
+        ListaFeedEntry.objects.filter(lista_id=lista_id).delete()
+        backfill(lista_id)
+
+
+def lista_feed(lista):
+    """Entradas del feed de ``lista``, de la más reciente a la más antigua."""
+    return ListaFeedEntry.objects.filter(lista=lista).order_by('-created_at', '-tweet_id').only('created_at', 'tweet_id')
@@ -0,0 +1,132 @@
+"""
+Timeline en vivo con Server-Sent Events.
+
+Un hub en memoria (uno por proceso) reparte los tweets nuevos a las
+conexiones abiertas. Cada conexión se suscribe a canales:
+
+- ``author:<id>``: tweets de una cuenta (el inicio se suscribe a las cuentas
+  que sigue y a la propia).
+- ``lista:<id>``: tweets de los miembros de una lista.
+
+Cada suscripción tiene una cola ``asyncio`` acotada; si el cliente no lee a
+tiempo se descartan los mensajes más viejos en vez de acumular memoria. Las
+conexiones viven en el event loop (sin un hilo por cliente), así que solo
+funciona bajo ASGI (uvicorn/daphne). Con varios procesos cada uno tiene su
+propio hub y solo ve los tweets publicados en él.
+"""
+import asyncio
+import threading
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+
+from . import fragments
+from .cards import cards_for_ids
+from .models import MiembroDeLista
+
+BUFFER_SIZE = getattr(settings, 'TWITTOR_LIVE_BUFFER', 50)
+HEARTBEAT = getattr(settings, 'TWITTOR_LIVE_HEARTBEAT', 15)
+
+Message = namedtuple('Message', 'id html')
+
+
+class Subscription:
+    """Cola acotada de una conexión; se puede alimentar desde cualquier hilo."""
+
+    def __init__(self, channels, loop, size=BUFFER_SIZE):
+        self.channels = frozenset(channels)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=size)
+        self.dropped = 0
+
+    def put(self, message):
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout):
+        """Siguiente mensaje, o ``None`` si pasan ``timeout`` segundos (latido)."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Hub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, channels):
+        sub = Subscription(channels, asyncio.get_running_loop())
+        with self._lock:
+            for channel in sub.channels:
+                self._subscribers[channel].add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            for channel in sub.channels:
+                subs = self._subscribers.get(channel)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subscribers[channel]
+
+    def __bool__(self):
+        return bool(self._subscribers)
+
+    def listening(self, channels):
+        """Suscripciones a alguno de ``channels`` (cada una una sola vez)."""
+        with self._lock:
+            return set().union(*(self._subscribers.get(channel, ()) for channel in channels))
+
+    def publish(self, channels, message):
+        for sub in self.listening(channels):
+            sub.put(message)
+
+
+hub = Hub()
+
+
+def author_channel(user_id):
+    return f'author:{user_id}'
+
+
+def lista_channel(lista_id):
+    return f'lista:{lista_id}'
+
+
+def publish_tweet(tweet_id, author_id):
+    """Reparte la tarjeta de un tweet nuevo a quien esté escuchando a su autor o sus listas."""
+    if not hub:
+        return  # nadie conectado: ni siquiera se buscan las listas
+    channels = [author_channel(author_id)]
+    channels += [lista_channel(pk) for pk in MiembroDeLista.objects.filter(usuario_id=author_id).values_list('lista_id', flat=True)]
+    if not hub.listening(channels):
+        return
+    tweets = cards_for_ids([tweet_id])
+    if tweets:
+        hub.publish(channels, Message(tweet_id, fragments.cached_cards(tweets)[0]))
+
+
+def format_event(message, token):
+    """Mensaje SSE ``tweet`` con la tarjeta ya rellenada para el visitante."""
+    data = fragments.fill(message.html, token).strip().replace('\n', '\ndata: ')
+    return f'event: tweet\nid: {message.id}\ndata: {data}\n\n'
+
+
+async def stream(channels, token):
+    """Generador asíncrono de eventos SSE para ``channels``; se desuscribe al cerrar."""
+    sub = hub.subscribe(channels)
+    try:
+        yield f'retry: {HEARTBEAT * 1000}\n\n'
+        while True:
+            message = await sub.get(HEARTBEAT)
+            yield ': ping\n\n' if message is None else format_event(message, token)
+    finally:
+        hub.unsubscribe(sub)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import hashtags
+
+
+class Command(BaseCommand):
+    help = "Indexa los hashtags de los tweets existentes (Hashtag/TweetHashtag)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk", type=int, default=2000, help="Tweets por lote")
+
+    def handle(self, *args, **opts):
+        done = hashtags.backfill(chunk_size=opts["chunk"])
+        self.stdout.write(self.style.SUCCESS(f"Tweets indexados: {done}"))
@@ -0,0 +1,219 @@
+import io
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager, suppress
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from core import routers
+from core import urls as core_urls
+from core.models import Coleccion, Lista, MiembroDeLista, Tweet
+
+# Cómo llamar cada ruta de core/urls.py: (método, args, datos POST).
+# Las rutas destructivas (borrar colecciones/miembros) y los streams SSE no se miden.
+SKIPPED = {"eliminar_coleccion", "list_remove_member", "signup", "timeline_stream", "list_stream"}
+
+
+def percentile(values, p):
+    """Percentil por rango más cercano (``values`` ya ordenado)."""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+@contextmanager
+def temporary_database():
+    """
+    Base de datos de pruebas para el primario; las réplicas con ``TEST['MIRROR']``
+    leen de ella, como en ``manage.py test``. Las que no son espejo del primario
+    seguirían leyendo el archivo real, así que el router deja de usarlas.
+    """
+    old_names = {alias: connections[alias].settings_dict["NAME"] for alias in connections}
+    test_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    mirrors = []
+    try:
+        for alias in connections:
+            if connections[alias].settings_dict["TEST"].get("MIRROR") == DEFAULT_DB_ALIAS:
+                connections[alias].close()
+                connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+                mirrors.append(alias)
+        with override_settings(TWITTOR_DB_REPLICAS=[alias for alias in routers.replicas() if alias in mirrors]):
+            yield
+    finally:
+        connections.close_all()
+        for alias in mirrors:
+            connections[alias].settings_dict["NAME"] = old_names[alias]
+        connection.creation.destroy_test_db(old_names[DEFAULT_DB_ALIAS], verbosity=0)
+        # Los hilos de los clientes que siguen vivos no cierran su conexión: sin
+        # esto quedarían el WAL y la memoria compartida de SQLite junto al proyecto
+        for suffix in ("-wal", "-shm"):
+            with suppress(OSError):
+                os.remove(f"{test_name}{suffix}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark HTTP de las rutas de core: crea un conjunto de datos determinista en una base "
+        "de datos temporal, recorre cada ruta con el cliente de pruebas (usuario logueado) y "
+        "reporta p50/p95/p99, consultas SQL y bytes en JSON. Con --compare diffea dos corridas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200, help="Usuarios del conjunto de datos")
+        parser.add_argument("--tweets", type=int, default=5000, help="Tweets base del conjunto de datos")
+        parser.add_argument("--requests", type=int, default=30, help="Peticiones medidas por ruta")
+        parser.add_argument("--warmup", type=int, default=3, help="Peticiones de calentamiento por ruta")
+        parser.add_argument("--route", action="append", default=[], help="Medir solo estas rutas (repetible)")
+        parser.add_argument("--output", help="Archivo JSON de salida (por defecto stdout)")
+        parser.add_argument("--compare", nargs=2, metavar=("BASE", "NUEVO"), help="Compara dos resultados JSON")
+        parser.add_argument("--threshold", type=float, default=10.0, help="(--compare) %% de empeoramiento que se marca")
+
+    def handle(self, *args, **opts):
+        if opts["compare"]:
+            return self.compare(*opts["compare"], threshold=opts["threshold"])
+
+        # Base de datos y MEDIA_ROOT temporales para no tocar los datos reales
+        media = tempfile.mkdtemp()
+        try:
+            with temporary_database(), override_settings(ALLOWED_HOSTS=["testserver"], MEDIA_ROOT=media):
+                call_command("seed", bulk=True, users=opts["users"], tweets=opts["tweets"], stdout=io.StringIO())
+                result = self.run_routes(opts)
+        finally:
+            shutil.rmtree(media, ignore_errors=True)
+
+        payload = json.dumps(result, indent=2, ensure_ascii=False)
+        if opts["output"]:
+            with open(opts["output"], "w") as fh:
+                fh.write(payload)
+            self.stdout.write(self.style.SUCCESS(f"Resultados en {opts['output']}"))
+        else:
+            self.stdout.write(payload)
+
+    def fixture(self):
+        """Objetos con los que se arma cada URL (deterministas gracias al seed)."""
+        viewer = User.objects.filter(username__startswith="demo").order_by("pk").first()
+        author = viewer.following.select_related("following").first().following
+        tweet = Tweet.objects.filter(user=author).order_by("pk").first()
+        lista = Lista.objects.create(nombre="bench", creador=viewer)
+        MiembroDeLista.objects.create(lista=lista, usuario=author)
+        coleccion = Coleccion.objects.create(nombre="bench", usuario=viewer)
+        coleccion.tweets.add(*Tweet.objects.order_by("pk")[:100])
+        return {"viewer": viewer, "author": author, "tweet": tweet, "lista": lista, "coleccion": coleccion}
+
+    def routes(self, fx):
+        tw, lista, col = fx["tweet"].pk, fx["lista"].pk, fx["coleccion"].pk
+        return {
+            "timeline": ("get", [], None),
+            "explore": ("get", [], None),
+            "search": ("get", [], {"q": "Django"}),
+            "tag": ("get", ["Django"], None),
+            "notifications": ("get", [], None),
+            "profile": ("get", [fx["author"].username], None),
+            "tweet_detail": ("get", [tw], None),
+            "like_toggle": ("post", [tw], {}),
+            "retweet": ("post", [tw], {}),
+            "quote": ("get", [tw], None),
+            "my_lists": ("get", [], None),
+            "list_create": ("get", [], None),
+            "list_feed": ("get", [lista], None),
+            "list_members": ("get", [lista], None),
+            "lista_colecciones": ("get", [], None),
+            "crear_coleccion": ("get", [], None),
+            "detalle_coleccion": ("get", [col], None),
+            "agregar_a_coleccion": ("get", [tw], None),
+            "agregar_a_coleccion_ajax": ("get", [], None),
+        }
+
+    def run_routes(self, opts):
+        fx = self.fixture()
+        client = Client(raise_request_exception=False)
+        client.force_login(fx["viewer"])
+        routes = self.routes(fx)
+        names = [p.name for p in core_urls.urlpatterns if p.name]
+        missing = [n for n in names if n not in routes and n not in SKIPPED]
+        if missing:
+            raise CommandError(f"Rutas sin definir en el benchmark: {', '.join(missing)}")
+        if opts["route"]:
+            names = [n for n in names if n in opts["route"]]
+
+        result = {
+            "meta": {
+                "users": opts["users"],
+                "tweets": opts["tweets"],
+                "requests": opts["requests"],
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "routes": {},
+        }
+        for name in names:
+            if name in SKIPPED:
+                continue
+            method, args, data = routes[name]
+            url = reverse(name, args=args)
+            call = getattr(client, method)
+            for _ in range(opts["warmup"]):
+                call(url, data)
+            latencies, queries, sizes, statuses = [], [], [], set()
+            for _ in range(opts["requests"]):
+                # Primario y réplicas: las lecturas pueden ir a cualquiera
+                with ExitStack() as stack:
+                    captured = [stack.enter_context(CaptureQueriesContext(conn)) for conn in connections.all()]
+                    start = time.perf_counter()
+                    response = call(url, data)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                queries.append(sum(len(ctx.captured_queries) for ctx in captured))
+                sizes.append(len(response.content))
+                statuses.add(response.status_code)
+            latencies.sort()
+            result["routes"][name] = {
+                "url": url,
+                "method": method.upper(),
+                "status": sorted(statuses),
+                "p50_ms": round(percentile(latencies, 50), 3),
+                "p95_ms": round(percentile(latencies, 95), 3),
+                "p99_ms": round(percentile(latencies, 99), 3),
+                "queries": sorted(queries)[len(queries) // 2],
+                "bytes": sorted(sizes)[len(sizes) // 2],
+            }
+            self.stderr.write(f"{name:<26} p50 {result['routes'][name]['p50_ms']:>8.2f} ms")
+        return result
+
+    def compare(self, base_path, new_path, threshold):
+        with open(base_path) as fh:
+            base = json.load(fh)["routes"]
+        with open(new_path) as fh:
+            new = json.load(fh)["routes"]
+
+        def delta(a, b):
+            return (b - a) / a * 100 if a else 0.0
+
+        self.stdout.write(f"{'ruta':<26}{'p50':>20}{'p95':>20}{'consultas':>11}{'bytes':>17}")
+        regressions = []
+        for name in sorted(base.keys() & new.keys()):
+            a, b = base[name], new[name]
+            d50, d95 = delta(a["p50_ms"], b["p50_ms"]), delta(a["p95_ms"], b["p95_ms"])
+            self.stdout.write(
+                f"{name:<26}"
+                f"{a['p50_ms']:>7.2f}→{b['p50_ms']:<7.2f}{d50:+4.0f}%"
+                f"{a['p95_ms']:>7.2f}→{b['p95_ms']:<7.2f}{d95:+4.0f}%"
+                f"{a['queries']:>5}→{b['queries']:<5}"
+                f"{a['bytes']:>8}→{b['bytes']:<8}"
+            )
+            if d95 > threshold or b["queries"] > a["queries"]:
+                regressions.append(name)
+        for name in sorted(base.keys() ^ new.keys()):
+            self.stdout.write(f"{name:<26} solo en {'BASE' if name in base else 'NUEVO'}")
+        if regressions:
+            self.stdout.write(self.style.WARNING(f"Posibles regresiones: {', '.join(regressions)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Sin regresiones por encima del umbral."))
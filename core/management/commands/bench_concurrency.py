@@ -0,0 +1,161 @@
+import asyncio
+import io
+import json
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.models import Lista, MiembroDeLista
+
+from .bench import percentile, temporary_database
+
+# Vistas de lectura que son ``async def``: el resto se mide con ``bench``
+ROUTES = {
+    "timeline": ([], {}),
+    "explore": ([], {}),
+    "search": ([], {"q": "Django"}),
+    "tag": (["Django"], {}),
+    "list_feed": (["lista"], {}),
+    "notifications": ([], {}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el rendimiento con peticiones concurrentes de los manejadores WSGI y ASGI de Django "
+        "sobre las vistas de lectura async, en una base de datos temporal. WSGI atiende con un pool de "
+        "hilos (como gunicorn --threads); ASGI atiende todas las peticiones en el event loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200, help="Usuarios del conjunto de datos")
+        parser.add_argument("--tweets", type=int, default=5000, help="Tweets base del conjunto de datos")
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Peticiones simultáneas")
+        parser.add_argument("--requests", type=int, default=200, help="Peticiones por nivel de concurrencia")
+        parser.add_argument("--threads", type=int, default=8, help="Hilos del servidor WSGI simulado")
+        parser.add_argument("--route", action="append", default=[], help="Medir solo estas rutas (repetible)")
+        parser.add_argument("--output", help="Archivo JSON de salida")
+
+    def handle(self, *args, **opts):
+        unknown = set(opts["route"]) - ROUTES.keys()
+        if unknown:
+            raise CommandError(f"Rutas desconocidas: {', '.join(sorted(unknown))}")
+
+        # Base de datos y MEDIA_ROOT temporales para no tocar los datos reales
+        media = tempfile.mkdtemp()
+        try:
+            with temporary_database(), override_settings(ALLOWED_HOSTS=["testserver"], MEDIA_ROOT=media):
+                call_command("seed", bulk=True, users=opts["users"], tweets=opts["tweets"], stdout=io.StringIO())
+                result = self.run(opts)
+        finally:
+            shutil.rmtree(media, ignore_errors=True)
+
+        self.stdout.write(f"{'concurrencia':<14}{'WSGI req/s':>12}{'p95 ms':>10}{'ASGI req/s':>12}{'p95 ms':>10}{'ASGI/WSGI':>11}")
+        for level in result["levels"]:
+            w, a = level["wsgi"], level["asgi"]
+            ratio = a["rps"] / w["rps"] if w["rps"] else 0
+            self.stdout.write(
+                f"{level['concurrency']:<14}{w['rps']:>12.1f}{w['p95_ms']:>10.1f}{a['rps']:>12.1f}{a['p95_ms']:>10.1f}{ratio:>10.2f}x"
+            )
+        if opts["output"]:
+            with open(opts["output"], "w") as fh:
+                json.dump(result, fh, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultados en {opts['output']}"))
+
+    def urls(self, names):
+        viewer = User.objects.filter(username__startswith="demo").order_by("pk").first()
+        author = viewer.following.select_related("following").first().following
+        lista = Lista.objects.create(nombre="bench", creador=viewer)
+        MiembroDeLista.objects.create(lista=lista, usuario=author)
+        urls = []
+        for name in names:
+            args, query = ROUTES[name]
+            path = reverse(name, args=[lista.pk if a == "lista" else a for a in args])
+            urls.append((path, query))
+        return viewer, urls
+
+    def run(self, opts):
+        names = opts["route"] or list(ROUTES)
+        viewer, urls = self.urls(names)
+        session = Client()
+        session.force_login(viewer)
+        cookies = session.cookies
+        # Lista fija de peticiones: ambos modos piden exactamente lo mismo
+        plan = [urls[i % len(urls)] for i in range(opts["requests"])]
+
+        result = {
+            "meta": {
+                "users": opts["users"],
+                "tweets": opts["tweets"],
+                "requests": opts["requests"],
+                "threads": opts["threads"],
+                "routes": names,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "levels": [],
+        }
+        for level in opts["concurrency"]:
+            wsgi = self.run_wsgi(plan, cookies, level, opts["threads"])
+            asgi = asyncio.run(self.run_asgi(plan, cookies, level))
+            result["levels"].append({"concurrency": level, "wsgi": wsgi, "asgi": asgi})
+            self.stderr.write(f"concurrencia {level}: WSGI {wsgi['rps']:.1f} req/s, ASGI {asgi['rps']:.1f} req/s")
+        return result
+
+    def run_wsgi(self, plan, cookies, concurrency, threads):
+        """
+        ``concurrency`` clientes contra un servidor de ``threads`` hilos: si hay
+        más clientes que hilos, el resto espera en la cola del pool.
+        """
+        local = threading.local()
+
+        def call(url, query):
+            if not hasattr(local, "client"):
+                local.client = Client(raise_request_exception=False)
+                local.client.cookies = cookies
+            start = time.perf_counter()
+            response = local.client.get(url, query)
+            return (time.perf_counter() - start) * 1000, response.status_code
+
+        with ThreadPoolExecutor(max_workers=min(threads, concurrency)) as pool:
+            start = time.perf_counter()
+            samples = list(pool.map(lambda req: call(*req), plan))
+            elapsed = time.perf_counter() - start
+        return self.summary(samples, elapsed)
+
+    async def run_asgi(self, plan, cookies, concurrency):
+        """``concurrency`` clientes contra el manejador ASGI, todos en el mismo event loop."""
+        client = AsyncClient(raise_request_exception=False)
+        client.cookies = cookies
+        slots = asyncio.Semaphore(concurrency)
+
+        async def call(url, query):
+            async with slots:
+                start = time.perf_counter()
+                response = await client.get(url, query)
+                return (time.perf_counter() - start) * 1000, response.status_code
+
+        start = time.perf_counter()
+        samples = await asyncio.gather(*(call(url, query) for url, query in plan))
+        elapsed = time.perf_counter() - start
+        return self.summary(samples, elapsed)
+
+    def summary(self, samples, elapsed):
+        latencies = sorted(ms for ms, _ in samples)
+        errors = sum(1 for _, status in samples if status != 200)
+        if errors:
+            raise CommandError(f"{errors} peticiones no respondieron 200")
+        return {
+            "rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+        }
@@ -0,0 +1,62 @@
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from core.management.commands.seed import PHRASES, TIPS, WORDS, rand_hashtags
+from core.templatetags import extras
+
+LEGACY_HASHTAG_RE = re.compile(r'(?P<tag>#\w+)')
+LEGACY_MENTION_RE = re.compile(r'(?P<at>@[A-Za-z0-9_\.\-]+)')
+
+
+def legacy_linkify(text):
+    """Implementación anterior (dos pasadas de re.sub y reverse() por enlace), como referencia."""
+    def link_tag(m):
+        tag = m.group('tag')[1:]
+        return f'<a class="text-blue-600 hover:underline" href="{reverse("tag", args=[tag])}">#{tag}</a>'
+
+    def link_mention(m):
+        user = m.group('at')[1:]
+        return f'<a class="text-blue-600 hover:underline" href="{reverse("profile", args=[user])}">@{user}</a>'
+
+    html = LEGACY_HASHTAG_RE.sub(link_tag, text)
+    return LEGACY_MENTION_RE.sub(link_mention, html)
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark de linkify: tweets por segundo (y ms por cada 1k tweets)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tweets", type=int, default=1000, help="Tweets distintos por ronda")
+        parser.add_argument("--rounds", type=int, default=5, help="Rondas por variante")
+
+    def handle(self, *args, **opts):
+        random.seed(42)
+        users = [f"user{i}" for i in range(50)]
+        texts = []
+        for i in range(opts["tweets"]):
+            phrase = random.choice(PHRASES).format(topic=random.choice(WORDS), tip=random.choice(TIPS))
+            texts.append(f"{phrase} {rand_hashtags(random.randint(1, 2))} @{random.choice(users)} #{i}")
+
+        def run(fn, clear=None):
+            best = float("inf")
+            for _ in range(opts["rounds"]):
+                if clear:
+                    clear()
+                start = time.perf_counter()
+                for text in texts:
+                    fn(text)
+                best = min(best, time.perf_counter() - start)
+            return best
+
+        variants = [
+            ("legacy (2 pasadas)", run(legacy_linkify)),
+            ("1 pasada, sin caché", run(extras.linkify, extras._linkify.cache_clear)),
+            ("1 pasada, caché LRU", run(extras.linkify)),
+        ]
+        n = len(texts)
+        for name, seconds in variants:
+            self.stdout.write(f"{name:<22} {n / seconds:>12,.0f} tweets/s  {seconds * 1000 / n * 1000:>8.2f} ms/1k")
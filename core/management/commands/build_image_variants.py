@@ -0,0 +1,34 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from core import fragments, images
+from core.models import Tweet, UserProfile
+
+# (modelo, campo de imagen, campo que identifica las tarjetas a invalidar, invalidación)
+TARGETS = (
+    (Tweet, "image", "pk", fragments.bump_tweet),
+    (UserProfile, "avatar", "user_id", fragments.bump_user),
+)
+
+
+class Command(BaseCommand):
+    help = "Genera las variantes WebP/JPEG de las imágenes de tweets y avatares que aún no las tienen."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos en paralelo")
+        parser.add_argument("--force", action="store_true", help="Regenera también las que ya están marcadas")
+
+    def handle(self, *args, **opts):
+        for model, field, card_key, bump in TARGETS:
+            rows = model.objects.exclude(**{f"{field}__isnull": True}).exclude(**{field: ""})
+            if not opts["force"]:
+                rows = rows.filter(**{f"{field}_derived": False})
+            rows = list(rows.values_list("pk", field, card_key))
+
+            done = set(images.build([(name, field) for _, name, _ in rows], workers=opts["workers"]))
+            ready = [row for row in rows if row[1] in done]
+            model.objects.filter(pk__in=[pk for pk, _, _ in ready]).update(**{f"{field}_derived": True})
+            for _, _, key in ready:
+                bump(key)
+            self.stdout.write(self.style.SUCCESS(f"{model.__name__}.{field}: {len(ready)} de {len(rows)} con variantes"))
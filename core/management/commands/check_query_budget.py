@@ -0,0 +1,13 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Atajo para `manage.py test core.tests.QueryBudgetTests`: mide las consultas SQL de cada "
+        "feed con 10 y con 500 tweets en la base de datos de pruebas y falla si alguna página "
+        "excede su presupuesto o crece con el número de tweets."
+    )
+
+    def handle(self, *args, **opts):
+        call_command("test", "core.tests.QueryBudgetTests", verbosity=opts["verbosity"])
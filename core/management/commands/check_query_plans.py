@@ -0,0 +1,13 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Atajo para `manage.py test core.tests.QueryPlanTests`: corre EXPLAIN QUERY PLAN sobre la "
+        "consulta de cada feed (primera página y siguientes) y las búsquedas calientes, y falla si "
+        "alguna recorre una tabla completa u ordena en una tabla temporal. Solo SQLite."
+    )
+
+    def handle(self, *args, **opts):
+        call_command("test", "core.tests.QueryPlanTests", verbosity=opts["verbosity"])
@@ -0,0 +1,76 @@
+import glob
+import os
+import pstats
+from collections import Counter, defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import profiling
+
+SORT_KEYS = {"tottime": 2, "cumtime": 3}
+
+
+class Command(BaseCommand):
+    help = (
+        "Junta los perfiles de TWITTOR_PROFILE_DIR por nombre de ruta: tabla de funciones más "
+        "costosas (cProfile) y, con --collapsed, un archivo de pilas colapsadas por ruta para "
+        "flamegraph.pl o speedscope. Con --token imprime una cabecera para perfilar una petición."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", help="Directorio de perfiles (por defecto TWITTOR_PROFILE_DIR)")
+        parser.add_argument("--url-name", action="append", default=[], help="Solo estas rutas (repetible)")
+        parser.add_argument("--top", type=int, default=15, help="Funciones por ruta")
+        parser.add_argument("--sort", choices=sorted(SORT_KEYS), default="tottime", help="Orden de la tabla")
+        parser.add_argument("--collapsed", metavar="DIR", help="Escribir <ruta>.collapsed en DIR")
+        parser.add_argument("--token", action="store_true", help="Imprimir la cabecera firmada y salir")
+
+    def handle(self, *args, **opts):
+        if opts["token"]:
+            self.stdout.write(f"{profiling.HEADER}: {profiling.token()}")
+            return
+
+        directory = opts["dir"] or profiling.profile_dir()
+        by_url = defaultdict(list)
+        for path in sorted(glob.glob(os.path.join(directory, "*" + profiling.PROF_SUFFIX))):
+            by_url[profiling.url_name_of(path)].append(path)
+        if opts["url_name"]:
+            by_url = {name: paths for name, paths in by_url.items() if name in opts["url_name"]}
+        if not by_url:
+            raise CommandError(f"No hay perfiles en {directory}")
+
+        if opts["collapsed"]:
+            os.makedirs(opts["collapsed"], exist_ok=True)
+        for url_name, paths in sorted(by_url.items()):
+            self.report(url_name, paths, opts)
+            if opts["collapsed"]:
+                out = os.path.join(opts["collapsed"], f"{url_name}{profiling.STACKS_SUFFIX}")
+                samples = self.write_collapsed(paths, out)
+                self.stdout.write(f"  {samples} muestras de pila → {out}")
+        self.stdout.write(self.style.SUCCESS(f"{sum(map(len, by_url.values()))} perfiles en {len(by_url)} rutas ✅"))
+
+    def report(self, url_name, paths, opts):
+        stats = pstats.Stats(*paths)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][SORT_KEYS[opts["sort"]]], reverse=True)
+        self.stdout.write(f"\n{url_name} ({len(paths)} peticiones, {stats.total_tt * 1000:.1f} ms en total)")
+        self.stdout.write(f"  {'llamadas':>10} {'propio ms':>10} {'acum. ms':>10}  función")
+        for (filename, line, func), (_, calls, tottime, cumtime, _) in rows[:opts["top"]]:
+            where = f"{os.path.basename(filename)}:{line}" if line else filename
+            self.stdout.write(f"  {calls:>10} {tottime * 1000:>10.2f} {cumtime * 1000:>10.2f}  {func} ({where})")
+
+    def write_collapsed(self, paths, out):
+        """Suma las pilas colapsadas de los perfiles de ``paths``; devuelve el total de muestras."""
+        stacks = Counter()
+        for path in paths:
+            stacked = path[:-len(profiling.PROF_SUFFIX)] + profiling.STACKS_SUFFIX
+            if not os.path.exists(stacked):
+                continue
+            with open(stacked, encoding="utf-8") as f:
+                for line in f:
+                    stack, _, count = line.rstrip("\n").rpartition(" ")
+                    if stack:
+                        stacks[stack] += int(count)
+        with open(out, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return sum(stacks.values())
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core import list_feeds
+from core.models import Lista
+
+
+class Command(BaseCommand):
+    help = "Borra y reconstruye los feeds materializados de las listas desde Tweet y MiembroDeLista."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lista", type=int, action="append", default=[], help="Id de la lista (repetible). Por defecto: todas")
+
+    def handle(self, *args, **opts):
+        listas = Lista.objects.all()
+        if opts["lista"]:
+            listas = listas.filter(pk__in=opts["lista"])
+        total = 0
+        for lista_id in list(listas.values_list("id", flat=True)):
+            list_feeds.rebuild(lista_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f"Feeds de listas reconstruidos: {total}"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from core.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda de tweets del backend configurado."
+
+    def handle(self, *args, **opts):
+        backend = get_backend()
+        total = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"{type(backend).__name__}: {total} tweets indexados"))
@@ -0,0 +1,21 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from core import timelines
+
+
+class Command(BaseCommand):
+    help = "Borra y reconstruye los timelines materializados desde Tweet y Follow."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", default=[], help="Username a procesar (repetible). Por defecto: todos")
+
+    def handle(self, *args, **opts):
+        users = User.objects.all()
+        if opts["user"]:
+            users = users.filter(username__in=opts["user"])
+        total = 0
+        for user_id in list(users.values_list("id", flat=True)):
+            timelines.rebuild(user_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f"Timelines reconstruidos: {total}"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula los contadores de likes/comentarios/retuits de Tweet y de tweets guardados de "
+        "Coleccion, y corrige los desfasados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=1000, help="Tweets por lote")
+
+    def handle(self, *args, **opts):
+        checked, fixed = counters.reconcile(batch_size=opts["batch"])
+        self.stdout.write(self.style.SUCCESS(f"Tweets revisados: {checked}, corregidos: {fixed}"))
+        checked, fixed = counters.reconcile_colecciones()
+        self.stdout.write(self.style.SUCCESS(f"Colecciones revisadas: {checked}, corregidas: {fixed}"))
@@ -1,12 +1,18 @@
 
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
 from pathlib import Path
 
 from django.conf import settings
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from django.core.files.base import ContentFile
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
 
 try:
     from faker import Faker
@@ -14,7 +20,9 @@ try:
 except Exception:
     HAVE_FAKER = False
 
+from core import notifications
 from core.models import UserProfile, Follow, Tweet, Like, Comment, Notification
+from core.notifications import Event
 
 WORDS = [
     "Django", "Tailwind", "IA", "Python", "MachineLearning", "DeepLearning", "Panamá",
@@ -82,6 +90,34 @@ def make_avatar_png(initial: str, size=128):
     return ContentFile(bio.getvalue())
 
 
+def make_tweet_png(topic: str, size=(800, 450)):
+    """PNG de demostración para un tweet: color aleatorio y el tema escrito."""
+    try:
+        from PIL import Image, ImageDraw
+    except Exception:
+        return None
+    img = Image.new("RGB", size, (random.randint(20,220), random.randint(20,220), random.randint(20,220)))
+    d = ImageDraw.Draw(img)
+    d.text((20, 20), f"Demo {topic}", fill=(255,255,255))
+    buf = BytesIO()
+    img.save(buf, format="PNG")
+    return ContentFile(buf.getvalue())
+
+
+def write_png(job):
+    """Tarea para el pool de procesos: ``(ruta, tipo, texto, semilla)`` → archivo PNG."""
+    path, kind, text, seed = job
+    random.seed(seed)
+    content = make_avatar_png(text) if kind == "avatar" else make_tweet_png(text)
+    if content is not None:
+        Path(path).write_bytes(content.read())
+
+
+def chunked(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
 class Command(BaseCommand):
     help = "Seed database with demo users, tweets, comments, likes, follows, and images."
 
@@ -96,6 +132,11 @@ class Command(BaseCommand):
         parser.add_argument("--comment_factor", type=float, default=0.20, help="Fracción de tweets que recibirán 1-3 comentarios")
         parser.add_argument("--images", action="store_true", help="Intenta generar imágenes dummy para algunos tweets")
         parser.add_argument("--password", type=str, default="demo12345", help="Contraseña por defecto para usuarios demo")
+        parser.add_argument("--bulk", action="store_true", help="Modo masivo: bulk_create por lotes, para millones de filas")
+        parser.add_argument("--batch", type=int, default=5000, help="(--bulk) Filas por lote/transacción")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="(--bulk) Procesos para generar imágenes")
+        parser.add_argument("--max_follows", type=int, default=200, help="(--bulk) Máximo de cuentas seguidas por usuario")
+        parser.add_argument("--max_likes", type=int, default=50, help="(--bulk) Máximo de likes por tweet")
 
     def handle(self, *args, **opts):
         users_n = opts["users"]
@@ -136,6 +177,9 @@ class Command(BaseCommand):
                 User.objects.create_superuser("admin", "admin@example.com", "admin12345")
                 self.stdout.write(self.style.SUCCESS("Superusuario admin/admin12345 creado."))
 
+        if opts["bulk"]:
+            return self.handle_bulk(opts, retweet_ratio, quote_ratio, like_factor, comment_factor)
+
         self.stdout.write(self.style.NOTICE("Creando usuarios..."))
         usernames = []
         users = []
@@ -204,6 +248,9 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS(f"Publicaciones base: {len(created_tweets)}"))
 
+        # Las notificaciones se juntan y se escriben agrupadas al final
+        events = []
+
         # Retweets
         r_n = int(len(created_tweets) * retweet_ratio)
         self.stdout.write(f"Creando retuits: {r_n}")
@@ -214,7 +261,7 @@ class Command(BaseCommand):
                 continue
             if not Tweet.objects.filter(user=actor, parent=base, is_retweet=True).exists():
                 Tweet.objects.create(user=actor, parent=base, is_retweet=True, content="")
-                Notification.objects.create(actor=actor, recipient=base.user, verb="retwitteó tu publicación", tweet=base)
+                events.append(Event(actor.pk, base.user_id, notifications.RETWEET, base.pk, timezone.now()))
 
         # Quotes
         q_n = int(len(created_tweets) * quote_ratio)
@@ -227,7 +274,7 @@ class Command(BaseCommand):
             topic = random.choice(WORDS)
             text = f"Mi opinión: {random.choice(PHRASES).format(topic=topic, tip=random.choice(TIPS))} {rand_hashtags(1)}"
             Tweet.objects.create(user=actor, parent=base, is_retweet=False, content=text)
-            Notification.objects.create(actor=actor, recipient=base.user, verb="citó tu publicación", tweet=base)
+            events.append(Event(actor.pk, base.user_id, notifications.QUOTE, base.pk, timezone.now()))
 
         # Likes
         self.stdout.write("Añadiendo likes...")
@@ -239,7 +286,7 @@ class Command(BaseCommand):
                     continue
                 obj, created = Like.objects.get_or_create(user=u, tweet=tw)
                 if created:
-                    Notification.objects.create(actor=u, recipient=tw.user, verb="le gustó tu publicación", tweet=tw)
+                    events.append(Event(u.pk, tw.user_id, notifications.LIKE, tw.pk, timezone.now()))
 
         # Comments
         self.stdout.write("Creando comentarios...")
@@ -254,7 +301,173 @@ class Command(BaseCommand):
                     text = f"Interesante. Sobre {topic}, yo {random.choice(['probé', 'leí', 'vi'])} algo similar."
                     Comment.objects.create(user=author, tweet=tw, content=text)
                     if author != tw.user:
-                        Notification.objects.create(actor=author, recipient=tw.user, verb="comentó tu publicación", tweet=tw)
+                        events.append(Event(author.pk, tw.user_id, notifications.COMMENT, tw.pk, timezone.now()))
+        notifications.write_batch(events)
+
+        # Los likes/comentarios/retuits se crearon fila por fila: recalcula contadores
+        call_command("reconcile_counters", stdout=self.stdout)
 
         self.stdout.write(self.style.SUCCESS("Seeding completado ✅"))
         self.stdout.write("Sugerencia: prueba /explore, /search/?q=IA, y /n/ para ver notificaciones.")
+
+    # --- Modo masivo (--bulk) ---
+
+    def insert(self, model, objs, ignore_conflicts=True):
+        """bulk_create en lotes, cada lote en su propia transacción."""
+        batch = self.batch
+        for part in chunked(objs, batch):
+            with transaction.atomic():
+                model.objects.bulk_create(part, batch_size=batch, ignore_conflicts=ignore_conflicts)
+
+    def render_pngs(self, jobs):
+        """Genera los PNG en paralelo; el proceso principal solo escribe filas."""
+        if not jobs:
+            return
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for _ in pool.map(write_png, jobs, chunksize=64):
+                pass
+
+    def handle_bulk(self, opts, retweet_ratio, quote_ratio, like_factor, comment_factor):
+        users_n = opts["users"]
+        tweets_n = opts["tweets"]
+        self.batch = max(1, opts["batch"])
+        self.workers = max(1, opts["workers"])
+        random.seed(42)
+
+        if connection.vendor == "sqlite":
+            # Carga masiva: sin fsync por transacción y caché de páginas grande (solo en esta conexión)
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA synchronous = OFF")
+                cursor.execute("PRAGMA cache_size = -262144")
+
+        media = Path(settings.MEDIA_ROOT)
+        for sub in ["avatars", "tweets"]:
+            (media / sub).mkdir(parents=True, exist_ok=True)
+
+        # Usuarios: la contraseña se hashea una sola vez y se comparte
+        self.stdout.write(self.style.NOTICE(f"Creando usuarios (bulk): {users_n}"))
+        hashed = make_password(opts["password"])
+        start = (User.objects.order_by("-pk").values_list("pk", flat=True).first() or 0) + 1
+        usernames = [f"demo{start + i}" for i in range(users_n)]
+        self.insert(User, [User(username=u, email=f"{u}@example.com", password=hashed) for u in usernames])
+        # Ids en el mismo orden que ``usernames`` (el filtro no garantiza orden)
+        pk_by_username = {}
+        for part in chunked(usernames, self.batch):
+            pk_by_username.update(User.objects.filter(username__in=part).values_list("username", "pk"))
+        user_ids = [pk_by_username[u] for u in usernames]
+
+        avatar_jobs = [(str(media / "avatars" / f"{u}.png"), "avatar", u, i) for i, u in enumerate(usernames)]
+        self.render_pngs(avatar_jobs)
+        profiles = [
+            UserProfile(user_id=uid, bio="Bio de demostración", avatar=f"avatars/{u}.png")
+            for uid, u in zip(user_ids, usernames)
+        ]
+        self.insert(UserProfile, profiles)
+        self.stdout.write(self.style.SUCCESS(f"Usuarios creados: {len(user_ids)} (pass: {opts['password']})"))
+
+        # Follows
+        self.stdout.write("Creando follows (bulk)...")
+        k = min(max(3, len(user_ids)//5), max(1, len(user_ids)-1), opts["max_follows"])
+        follows = []
+        for uid in user_ids:
+            for vid in random.sample(user_ids, k=min(k + 1, len(user_ids))):
+                if vid != uid:
+                    follows.append(Follow(follower_id=uid, following_id=vid))
+            if len(follows) >= self.batch:
+                self.insert(Follow, follows)
+                follows = []
+        self.insert(Follow, follows)
+
+        # Tweets base (sin ignore_conflicts: no hay restricciones únicas y así se conocen los ids)
+        self.stdout.write(f"Creando publicaciones (bulk): {tweets_n}")
+        base_ids, base_authors, image_jobs = [], [], []
+        for part_start in range(0, tweets_n, self.batch):
+            part = []
+            for i in range(part_start, min(tweets_n, part_start + self.batch)):
+                author = random.choice(user_ids)
+                topic = random.choice(WORDS)
+                phrase = random.choice(PHRASES).format(topic=topic, tip=random.choice(TIPS))
+                text = f"{phrase} {rand_hashtags(random.randint(1,2))}{random_mention(usernames) if random.random()<0.25 else ''}"
+                tw = Tweet(user_id=author, content=text)
+                if opts["images"] and random.random() < 0.25:
+                    name = f"tweets/demo_bulk_{start}_{i}.png"
+                    tw.image = name
+                    image_jobs.append((str(media / name), "tweet", topic, i))
+                part.append(tw)
+            with transaction.atomic():
+                Tweet.objects.bulk_create(part, batch_size=self.batch)
+                ids = list(Tweet.objects.order_by("-pk").values_list("pk", flat=True)[:len(part)])[::-1]
+            base_ids += ids
+            base_authors += [tw.user_id for tw in part]
+        self.render_pngs(image_jobs)
+        self.stdout.write(self.style.SUCCESS(f"Publicaciones base: {len(base_ids)}"))
+
+        # Retuits y citas (+ notificaciones)
+        children, events = [], []
+        now = timezone.now()
+        r_n = int(len(base_ids) * retweet_ratio)
+        q_n = int(len(base_ids) * quote_ratio)
+        self.stdout.write(f"Creando retuits: {r_n} y citas: {q_n}")
+        seen_retweets = set()
+        for n in range(r_n + q_n):
+            idx = random.randrange(len(base_ids))
+            actor = random.choice(user_ids)
+            if actor == base_authors[idx]:
+                continue
+            if n < r_n:
+                if (actor, idx) in seen_retweets:
+                    continue
+                seen_retweets.add((actor, idx))
+                children.append(Tweet(user_id=actor, parent_id=base_ids[idx], is_retweet=True, content=""))
+                verb = notifications.RETWEET
+            else:
+                topic = random.choice(WORDS)
+                text = f"Mi opinión: {random.choice(PHRASES).format(topic=topic, tip=random.choice(TIPS))} {rand_hashtags(1)}"
+                children.append(Tweet(user_id=actor, parent_id=base_ids[idx], content=text))
+                verb = notifications.QUOTE
+            events.append(Event(actor, base_authors[idx], verb, base_ids[idx], now))
+        self.insert(Tweet, children, ignore_conflicts=False)
+
+        # Likes
+        self.stdout.write("Añadiendo likes (bulk)...")
+        likes = []
+        for tweet_id, author in zip(base_ids, base_authors):
+            n = min(int(len(user_ids)*like_factor*random.random()), opts["max_likes"])
+            for uid in random.sample(user_ids, k=min(n, len(user_ids))):
+                if uid == author:
+                    continue
+                likes.append(Like(user_id=uid, tweet_id=tweet_id))
+                events.append(Event(uid, author, notifications.LIKE, tweet_id, now))
+            if len(likes) >= self.batch:
+                self.insert(Like, likes)
+                notifications.write_batch(events)
+                likes, events = [], []
+        self.insert(Like, likes)
+
+        # Comentarios
+        self.stdout.write("Creando comentarios (bulk)...")
+        comments = []
+        for tweet_id, owner in zip(base_ids, base_authors):
+            if random.random() >= comment_factor:
+                continue
+            for _ in range(random.randint(1, 3)):
+                author = random.choice(user_ids)
+                topic = random.choice(WORDS)
+                text = f"Interesante. Sobre {topic}, yo {random.choice(['probé', 'leí', 'vi'])} algo similar."
+                comments.append(Comment(user_id=author, tweet_id=tweet_id, content=text))
+                if author != owner:
+                    events.append(Event(author, owner, notifications.COMMENT, tweet_id, now))
+        self.insert(Comment, comments, ignore_conflicts=False)
+        # Las notificaciones repetidas (mismo tweet y verbo) se agrupan en una fila
+        for part in chunked(events, self.batch):
+            notifications.write_batch(part)
+
+        # bulk_create no dispara señales: se reconstruyen los datos derivados
+        self.stdout.write("Reconstruyendo índices y contadores...")
+        call_command("backfill_timelines", stdout=self.stdout)
+        call_command("backfill_hashtags", chunk=self.batch, stdout=self.stdout)
+        call_command("rebuild_search_index", stdout=self.stdout)
+        call_command("reconcile_counters", batch=self.batch, stdout=self.stdout)
+        call_command("build_image_variants", workers=self.workers, stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS("Seeding masivo completado ✅"))
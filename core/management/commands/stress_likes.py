@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from core import likes
+from core.models import Like, Tweet
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de concurrencia de likes: muchos hilos dan y quitan likes al mismo tweet a la vez "
+        "(clics dobles incluidos) sobre una base temporal, y verifica que like_count coincide "
+        "exactamente con la tabla de likes y con el estado esperado de cada usuario."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20, help="Usuarios que dan like")
+        parser.add_argument("--clicks", type=int, default=3, help="Hilos (clics simultáneos) por usuario")
+        parser.add_argument("--rounds", type=int, default=5, help="Clics de cada hilo")
+
+    def handle(self, *args, **opts):
+        # En SQLite, un archivo (con WAL) y no la base en memoria compartida
+        tmpdir = tempfile.mkdtemp()
+        if connection.vendor == "sqlite":
+            connection.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(tmpdir, "likes.sqlite3")
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            author = User.objects.create_user("likes_author")
+            users = [User.objects.create_user(f"likes_{n}") for n in range(opts["users"])]
+            tweet = Tweet.objects.create(user=author, content="Dale like")
+            failures = []
+            failures += self.toggle_phase(tweet, users, opts)
+            failures += self.desired_phase(tweet, users, opts, liked=True)
+            failures += self.desired_phase(tweet, users, opts, liked=False)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        if failures:
+            raise CommandError("Conteos inexactos:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("Conteos exactos en todas las fases ✅"))
+
+    def hammer(self, tweet, users, opts, liked):
+        """Lanza ``clicks`` hilos por usuario, cada uno con ``rounds`` llamadas a ``set_like``."""
+        errors = Counter()
+        lock = threading.Lock()
+        start_line = threading.Barrier(len(users) * opts["clicks"])
+
+        def clicker(user):
+            start_line.wait()
+            try:
+                for _ in range(opts["rounds"]):
+                    try:
+                        likes.set_like(user.pk, tweet.pk, liked)
+                    except Exception as exc:
+                        with lock:
+                            errors[type(exc).__name__] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=clicker, args=(u,)) for u in users for _ in range(opts["clicks"])]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        calls = len(threads) * opts["rounds"] - sum(errors.values())
+        return calls / elapsed, errors
+
+    def verify(self, phase, tweet, expected_ids, rate, errors):
+        like_count = Tweet.objects.values_list("like_count", flat=True).get(pk=tweet.pk)
+        liked_ids = set(Like.objects.filter(tweet=tweet).values_list("user_id", flat=True))
+        self.stdout.write(
+            f"{phase:<14} {rate:>8.0f} clics/s  like_count={like_count}  likes={len(liked_ids)}  "
+            f"esperados={len(expected_ids)}  errores={dict(errors) or 0}"
+        )
+        failures = []
+        if errors:
+            failures.append(f"{phase}: {sum(errors.values())} errores ({', '.join(errors)})")
+        if like_count != len(liked_ids):
+            failures.append(f"{phase}: like_count={like_count} pero hay {len(liked_ids)} likes")
+        if liked_ids != expected_ids:
+            failures.append(f"{phase}: {len(liked_ids ^ expected_ids)} usuarios con el estado equivocado")
+        return failures
+
+    def toggle_phase(self, tweet, users, opts):
+        # Cada usuario alterna clicks × rounds veces: termina con like si el total es impar
+        rate, errors = self.hammer(tweet, users, opts, liked=None)
+        odd = opts["clicks"] * opts["rounds"] % 2 == 1
+        return self.verify("alternar", tweet, {u.pk for u in users} if odd else set(), rate, errors)
+
+    def desired_phase(self, tweet, users, opts, liked):
+        # Con el estado pedido, repetir el clic no cambia nada
+        rate, errors = self.hammer(tweet, users, opts, liked=liked)
+        return self.verify("dar like" if liked else "quitar like", tweet, {u.pk for u in users} if liked else set(), rate, errors)
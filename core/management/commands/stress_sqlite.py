@@ -0,0 +1,156 @@
+import io
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core import notifications, sqlite
+from core.models import Tweet
+
+from .bench import percentile, temporary_database
+
+# SQLite tal como lo deja Django: journal en disco, fsync por transacción,
+# transacciones diferidas y solo el timeout de 5 s del módulo sqlite3
+PLAIN = {
+    "pragmas": {**{name: None for name in sqlite.DEFAULT_PRAGMAS}, "journal_mode": "delete", "synchronous": "full"},
+    "transaction_mode": None,
+}
+TUNED = {"pragmas": {}, "transaction_mode": "IMMEDIATE"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de estrés de escritura: varios hilos dan likes y publican tweets a la vez (vía las "
+        "vistas) sobre una copia temporal en archivo, primero con SQLite sin ajustar y luego con los "
+        "PRAGMA de core.sqlite. Reporta operaciones/s, latencias y errores 'database is locked'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=16, help="Hilos escritores")
+        parser.add_argument("--ops", type=int, default=50, help="Operaciones por hilo")
+        parser.add_argument("--posts", type=float, default=0.25, help="Fracción de operaciones que publican")
+        parser.add_argument("--users", type=int, default=50, help="Usuarios del conjunto de datos")
+        parser.add_argument("--tweets", type=int, default=1000, help="Tweets del conjunto de datos")
+        parser.add_argument("--only", choices=["plain", "tuned"], help="Correr solo un modo")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "sqlite":
+            raise CommandError("Esta prueba es solo para SQLite.")
+
+        # WAL no existe en memoria: la base de pruebas va a un archivo temporal
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, "stress.sqlite3")
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = path
+        modes = {"plain": PLAIN, "tuned": TUNED}
+        if opts["only"]:
+            modes = {opts["only"]: modes[opts["only"]]}
+        try:
+            # Las imágenes del seed también van al directorio temporal, no al MEDIA_ROOT real
+            with temporary_database(), override_settings(
+                ALLOWED_HOSTS=["testserver"], MEDIA_ROOT=os.path.join(tmpdir, "media")
+            ):
+                call_command("seed", bulk=True, users=opts["users"], tweets=opts["tweets"], stdout=io.StringIO())
+                results = {name: self.run(mode, opts) for name, mode in modes.items()}
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        self.stdout.write(f"{'modo':<8}{'ops':>7}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'bloqueos':>10}{'otros errores':>15}")
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<8}{r['ops']:>7}{r['ops_per_s']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+                f"{r['locked']:>10}{r['errors']:>15}"
+            )
+        tuned = results.get("tuned")
+        if tuned and (tuned["locked"] or tuned["errors"]):
+            raise CommandError("Hubo errores de escritura con la configuración ajustada.")
+        self.stdout.write(self.style.SUCCESS("Listo ✅"))
+
+    def run(self, mode, opts):
+        # La configuración se aplica al abrir cada conexión: cerrar las que haya
+        connections.close_all()
+        options = connection.settings_dict["OPTIONS"]
+        original_mode = options.pop("transaction_mode", None)
+        if mode["transaction_mode"]:
+            options["transaction_mode"] = mode["transaction_mode"]
+        # Los bloqueos se cuentan aquí: no volcar cada traza a la consola
+        request_logger = logging.getLogger("django.request")
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            with override_settings(TWITTOR_SQLITE_PRAGMAS=mode["pragmas"]):
+                return self.hammer(opts)
+        finally:
+            request_logger.setLevel(level)
+            options.pop("transaction_mode", None)
+            if original_mode:
+                options["transaction_mode"] = original_mode
+            connections.close_all()
+
+    def hammer(self, opts):
+        users = list(User.objects.order_by("pk")[: opts["writers"]])
+        tweet_ids = list(Tweet.objects.order_by("-pk").values_list("pk", flat=True)[:200])
+        connection.close()
+        latencies, failures = [], Counter()
+        lock = threading.Lock()
+        start_line = threading.Barrier(len(users) + 1)
+
+        def writer(user, seed):
+            rng = random.Random(seed)
+            client = Client()
+            client.force_login(user)
+            start_line.wait()
+            mine = []
+            try:
+                for i in range(opts["ops"]):
+                    if rng.random() < opts["posts"]:
+                        url, data = reverse("timeline"), {"content": f"Estrés {user.pk}-{i} #stress"}
+                    else:
+                        url, data = reverse("like_toggle", args=[rng.choice(tweet_ids)]), {}
+                    began = time.perf_counter()
+                    try:
+                        client.post(url, data)
+                    except OperationalError as exc:
+                        with lock:
+                            failures["locked" if "locked" in str(exc) else "errors"] += 1
+                        continue
+                    except Exception:
+                        with lock:
+                            failures["errors"] += 1
+                        continue
+                    mine.append((time.perf_counter() - began) * 1000)
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(mine)
+
+        threads = [threading.Thread(target=writer, args=(user, n)) for n, user in enumerate(users)]
+        for thread in threads:
+            thread.start()
+        start_line.wait()
+        began = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        notifications.flush()
+
+        latencies.sort()
+        return {
+            "ops": len(latencies),
+            "ops_per_s": len(latencies) / elapsed,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "locked": failures["locked"],
+            "errors": failures["errors"],
+        }
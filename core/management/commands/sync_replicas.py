@@ -0,0 +1,49 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia la base SQLite primaria a cada réplica de TWITTOR_DB_REPLICAS con la API de backup "
+        "de SQLite (copia consistente aunque haya escrituras en curso). Con --watch repite cada N "
+        "segundos para simular la replicación en desarrollo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--alias", action="append", default=[], help="Solo estas réplicas (repetible)")
+        parser.add_argument("--watch", type=float, metavar="SEGUNDOS", help="Repetir la copia cada N segundos")
+
+    def handle(self, *args, **opts):
+        aliases = opts["alias"] or settings.TWITTOR_DB_REPLICAS
+        if not aliases:
+            raise CommandError("No hay réplicas configuradas (variable de entorno TWITTOR_DB_REPLICAS).")
+        unknown = set(aliases) - set(settings.TWITTOR_DB_REPLICAS)
+        if unknown:
+            raise CommandError(f"No son réplicas: {', '.join(sorted(unknown))}")
+        if any(connections[alias].vendor != "sqlite" for alias in ["default", *aliases]):
+            raise CommandError("sync_replicas solo copia bases SQLite; en otros motores usa su replicación.")
+
+        while True:
+            for alias in aliases:
+                started = time.perf_counter()
+                pages = self.copy(connections["default"].settings_dict["NAME"], connections[alias].settings_dict["NAME"])
+                self.stdout.write(f"{alias}: {pages} páginas en {(time.perf_counter() - started) * 1000:.0f} ms")
+            if not opts["watch"]:
+                break
+            time.sleep(opts["watch"])
+        self.stdout.write(self.style.SUCCESS("Réplicas al día ✅"))
+
+    def copy(self, source, target):
+        """Copia ``source`` sobre ``target`` en un solo paso (los lectores de la réplica esperan)."""
+        src = sqlite3.connect(source)
+        dst = sqlite3.connect(target, timeout=30)
+        try:
+            src.backup(dst)
+            return dst.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            dst.close()
+            src.close()
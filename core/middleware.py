@@ -0,0 +1,77 @@
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from . import perf, profiling, routers
+
+
+def _begin(request):
+    # Una petición que escribe (POST, ...) lee del primario desde el principio:
+    # no debe basar la escritura en una lectura atrasada de la réplica
+    pinned = routers.COOKIE in request.COOKIES or request.method not in ('GET', 'HEAD', 'OPTIONS')
+    return routers.begin_request(pinned)
+
+
+def _finish(token, response):
+    state = routers.end_request(token)
+    if state.wrote and routers.replicas():
+        # Las próximas peticiones leen del primario hasta que las réplicas se pongan al día
+        response.set_cookie(
+            routers.COOKIE, '1', max_age=getattr(settings, 'TWITTOR_REPLICA_STICKY_SECONDS', 5),
+            httponly=True, samesite='Lax',
+        )
+    return response
+
+
+@sync_and_async_middleware
+def StickyPrimaryMiddleware(get_response):
+    """Marca la petición para ``core.routers`` y fija el primario tras una escritura."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = _begin(request)
+            return _finish(token, await get_response(request))
+    else:
+        def middleware(request):
+            token = _begin(request)
+            return _finish(token, get_response(request))
+    return middleware
+
+
+@sync_and_async_middleware
+def PerformanceMiddleware(get_response):
+    """Mide SQL, plantillas y tiempo total de cada petición (ver ``core.perf``)."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            with perf.measure() as stats:
+                response = await get_response(request)
+            return perf.report(stats, request, response)
+    else:
+        def middleware(request):
+            with perf.measure() as stats:
+                response = get_response(request)
+            return perf.report(stats, request, response)
+    return middleware
+
+
+@sync_and_async_middleware
+def ProfilingMiddleware(get_response):
+    """Perfila las peticiones pedidas con cabecera firmada o por muestreo (ver ``core.profiling``)."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not profiling.requested(request):
+                return await get_response(request)
+            with profiling.capture() as result:
+                response = await get_response(request)
+            if result is not None:
+                profiling.save(result, request)
+            return response
+    else:
+        def middleware(request):
+            if not profiling.requested(request):
+                return get_response(request)
+            with profiling.capture() as result:
+                response = get_response(request)
+            if result is not None:
+                profiling.save(result, request)
+            return response
+    return middleware
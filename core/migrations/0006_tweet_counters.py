@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:46
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model, fk, **filters):
+    rows = model.objects.filter(**{fk: OuterRef('pk')}, **filters).order_by().values(fk).annotate(n=Count('*')).values('n')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Tweet = apps.get_model('core', 'Tweet')
+    Like = apps.get_model('core', 'Like')
+    Comment = apps.get_model('core', 'Comment')
+    Tweet.objects.update(
+        like_count=_count(Like, 'tweet'),
+        comment_count=_count(Comment, 'tweet'),
+        retweet_count=_count(Tweet, 'parent', is_retweet=True),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tweet',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tweet',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tweet',
+            name='retweet_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
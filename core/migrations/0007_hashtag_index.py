@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_tweet_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hashtag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=280, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TweetHashtag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('hashtag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tweet_hashtags', to='core.hashtag')),
+                ('tweet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tweet_hashtags', to='core.tweet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hashtag', '-created_at', '-tweet'], name='hashtag_recent')],
+                'unique_together': {('hashtag', 'tweet')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def create_fts(apps, schema_editor):
+    # Solo SQLite tiene FTS5; en otros motores core.search usa ContainsBackend.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS core_tweet_fts "
+        "USING fts5(body, username, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO core_tweet_fts (rowid, body, username) "
+        "SELECT t.id, t.content, u.username FROM core_tweet t JOIN auth_user u ON u.id = t.user_id"
+    )
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS core_tweet_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_hashtag_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_drop_redundant_fk_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='others_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
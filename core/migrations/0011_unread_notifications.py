@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_unread(apps, schema_editor):
+    UserProfile = apps.get_model('core', 'UserProfile')
+    Notification = apps.get_model('core', 'Notification')
+    unread = (
+        Notification.objects.filter(recipient=OuterRef('user'), read=False)
+        .order_by().values('recipient').annotate(n=Count('*')).values('n')
+    )
+    UserProfile.objects.update(unread_notifications=Coalesce(Subquery(unread, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_notification_others_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='recipient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-created_at', '-id'], name='notif_recipient_recent'),
+        ),
+        migrations.RunPython(fill_unread, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_unread_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tweet',
+            name='image_derived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_derived',
+            field=models.BooleanField(default=False),
+        ),
+    ]
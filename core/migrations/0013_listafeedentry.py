@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListaFeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('author', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('lista', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='core.lista')),
+                ('tweet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lista_feed_entries', to='core.tweet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['lista', '-created_at', '-tweet'], name='lista_feed_recent'), models.Index(fields=['lista', 'author'], name='lista_feed_author')],
+                'unique_together': {('lista', 'tweet')},
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_listafeedentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='miembrodelista',
+            name='usuario',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='tweet',
+            name='parent',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='children', to='core.tweet'),
+        ),
+        migrations.AlterField(
+            model_name='tweet',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='miembrodelista',
+            index=models.Index(fields=['usuario', 'lista'], name='miembro_usuario_lista'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'read', '-created_at'], name='notif_recipient_unread'),
+        ),
+        migrations.AddIndex(
+            model_name='tweet',
+            index=models.Index(fields=['-created_at', '-id'], name='tweet_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='tweet',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='tweet_user_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='tweet',
+            index=models.Index(fields=['parent', 'is_retweet', 'user'], name='tweet_parent_retweet'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:55
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def compact_retweets(apps, schema_editor):
+    Tweet = apps.get_model('core', 'Tweet')
+    retweets = Tweet.objects.filter(is_retweet=True)
+    # Retuits cuyo original ya no existe: sin texto propio no muestran nada
+    retweets.filter(parent__isnull=True).delete()
+    # Retuits repetidos del mismo usuario: se queda el primero
+    dupes = (
+        retweets.order_by().values('user', 'parent')
+        .annotate(first=Min('pk'), n=Count('*')).filter(n__gt=1)
+    )
+    for row in dupes:
+        retweets.filter(user=row['user'], parent=row['parent']).exclude(pk=row['first']).delete()
+    # El texto se lee del original
+    retweets.exclude(content='').update(content='')
+    rows = Tweet.objects.filter(parent=OuterRef('pk'), is_retweet=True).order_by().values('parent').annotate(n=Count('*')).values('n')
+    Tweet.objects.update(retweet_count=Coalesce(Subquery(rows, output_field=IntegerField()), 0))
+
+    if schema_editor.connection.vendor == 'sqlite':
+        # Los retuits ya no tienen texto que buscar
+        schema_editor.execute(
+            "DELETE FROM core_tweet_fts WHERE rowid IN (SELECT id FROM core_tweet WHERE is_retweet) "
+            "OR rowid NOT IN (SELECT id FROM core_tweet)"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(compact_retweets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tweet',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_retweet', True)), fields=('user', 'parent'), name='unique_retweet'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:59
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_tweet_count(apps, schema_editor):
+    Coleccion = apps.get_model('core', 'Coleccion')
+    Guardado = Coleccion.tweets.through
+    rows = Guardado.objects.filter(coleccion=OuterRef('pk')).order_by().values('coleccion').annotate(n=Count('*')).values('n')
+    Coleccion.objects.update(tweet_count=Coalesce(Subquery(rows, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_retweet_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coleccion',
+            name='tweet_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_tweet_count, migrations.RunPython.noop),
+    ]
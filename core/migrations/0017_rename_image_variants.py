@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def reset_derived(apps, schema_editor):
+    # Las variantes ahora incluyen la extensión original (foto.png.320w.webp):
+    # las viejas ya no se usan, hay que regenerarlas con build_image_variants
+    apps.get_model('core', 'Tweet').objects.filter(image_derived=True).update(image_derived=False)
+    apps.get_model('core', 'UserProfile').objects.filter(avatar_derived=True).update(avatar_derived=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_coleccion_tweet_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(reset_derived, migrations.RunPython.noop),
+    ]
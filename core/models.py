@@ -8,7 +8,11 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     bio = models.CharField(max_length=180, blank=True)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    # True cuando ya existen las variantes redimensionadas (ver core.images)
+    avatar_derived = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Se suma al crear notificaciones y vuelve a 0 al marcarlas como leídas
+    unread_notifications = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f'Perfil de {self.user.username}'
@@ -25,15 +29,36 @@ class Follow(models.Model):
         return f'{self.follower.username} → {self.following.username}'
 
 class Tweet(models.Model):
-    parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='children')
+    # parent y user quedan cubiertos por los índices compuestos de Meta
+    parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='children', db_index=False)
     is_retweet = models.BooleanField(default=False)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     content = models.CharField(max_length=280)
     image = models.ImageField(upload_to='tweets/', blank=True, null=True)
+    image_derived = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Contadores denormalizados: se actualizan con F() en las vistas y
+    # `manage.py reconcile_counters` corrige cualquier desfase.
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    retweet_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Explorar: todos los tweets paginados por cursor
+            models.Index(fields=['-created_at', '-id'], name='tweet_recent'),
+            # Perfil y copia al timeline/listas: tweets de un autor por fecha
+            models.Index(fields=['user', '-created_at', '-id'], name='tweet_user_recent'),
+            # ¿Ya lo retuiteé? y el conteo de retuits de cada tweet
+            models.Index(fields=['parent', 'is_retweet', 'user'], name='tweet_parent_retweet'),
+        ]
+        constraints = [
+            # Un retuit es una fila sin texto que apunta al original: uno por usuario
+            models.UniqueConstraint(
+                fields=['user', 'parent'], condition=models.Q(is_retweet=True), name='unique_retweet',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user.username}: {self.content[:30]}'
@@ -41,10 +66,6 @@ class Tweet(models.Model):
     def get_absolute_url(self):
         return reverse('tweet_detail', args=[self.pk])
 
-    @property
-    def like_count(self) -> int:
-        return self.likes.count()
-
 class Like(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name='likes')
@@ -56,6 +77,52 @@ class Like(models.Model):
     def __str__(self):
         return f'{self.user.username} ♥ {self.tweet_id}'
 
+
+class Hashtag(models.Model):
+    """Hashtag normalizado (sin '#' y en minúsculas)."""
+    name = models.CharField(max_length=280, unique=True)
+
+    def __str__(self):
+        return f'#{self.name}'
+
+
+class TweetHashtag(models.Model):
+    """Índice hashtag → tweet, escrito al publicar."""
+    # hashtag ya está cubierto por unique_together e índice compuesto
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name='tweet_hashtags', db_index=False)
+    tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name='tweet_hashtags')
+    # Copia de tweet.created_at para recorrer la etiqueta solo con el índice
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('hashtag', 'tweet')
+        indexes = [
+            models.Index(fields=['hashtag', '-created_at', '-tweet'], name='hashtag_recent'),
+        ]
+
+    def __str__(self):
+        return f'{self.hashtag_id} → {self.tweet_id}'
+
+
+class TimelineEntry(models.Model):
+    """Timeline materializado: una fila por (dueño, tweet), se llena al publicar."""
+    # owner y author ya están cubiertos por los índices compuestos de Meta
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries', db_index=False)
+    tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name='timeline_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False)
+    # Copia de tweet.created_at para poder recorrer el timeline solo con el índice
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('owner', 'tweet')
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-tweet'], name='timeline_owner_recent'),
+            models.Index(fields=['owner', 'author'], name='timeline_owner_author'),
+        ]
+
+    def __str__(self):
+        return f'{self.owner_id} ← {self.tweet_id}'
+
 class Comment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name='comments')
@@ -68,16 +135,28 @@ class Comment(models.Model):
 
 class Notification(models.Model):
     actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications_sent')
-    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications', db_index=False)
     verb = models.CharField(max_length=80)
     tweet = models.ForeignKey(Tweet, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
+    # Notificaciones agrupadas: "actor y N más" (ver core.notifications)
+    others_count = models.PositiveIntegerField(default=0)
+    # Actores distintos ya contados, para no volver a sumar al que repite
+    actor_ids = models.JSONField(default=list, blank=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Bandeja de un usuario paginada por cursor (también cubre recipient_id)
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notif_recipient_recent'),
+            # Sin leer de un usuario (marcar como leídas, agrupar eventos nuevos)
+            models.Index(fields=['recipient', 'read', '-created_at'], name='notif_recipient_unread'),
+        ]
 
     def __str__(self):
+        if self.others_count:
+            return f'{self.actor} y {self.others_count} más -> {self.recipient}: {self.verb}'
         return f'{self.actor} -> {self.recipient}: {self.verb}'
 
 
@@ -115,17 +194,41 @@ class Lista(models.Model):
 class MiembroDeLista(models.Model):
     """Tabla intermedia para la relación de pertenencia."""
     lista = models.ForeignKey(Lista, on_delete=models.CASCADE)
-    usuario = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Cubierto por miembro_usuario_lista
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     fecha_agregado = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         # Esto previene que un usuario sea agregado dos veces a la misma lista.
         unique_together = ('lista', 'usuario') 
+        indexes = [
+            # Listas en las que está un usuario (fan-out de sus tweets), sin leer la tabla
+            models.Index(fields=['usuario', 'lista'], name='miembro_usuario_lista'),
+        ]
         verbose_name = "Miembro de Lista"
         verbose_name_plural = "Miembros de Lista"
         
     def __str__(self):
         return f"{self.usuario.username} en {self.lista.nombre}"
+
+
+class ListaFeedEntry(models.Model):
+    """Feed materializado de una lista: una fila por (lista, tweet) de sus miembros."""
+    lista = models.ForeignKey(Lista, on_delete=models.CASCADE, related_name='feed_entries', db_index=False)
+    tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name='lista_feed_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False)
+    # Copia de tweet.created_at, igual que TimelineEntry
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('lista', 'tweet')
+        indexes = [
+            models.Index(fields=['lista', '-created_at', '-tweet'], name='lista_feed_recent'),
+            models.Index(fields=['lista', 'author'], name='lista_feed_author'),
+        ]
+
+    def __str__(self):
+        return f'{self.lista_id} ← {self.tweet_id}'
     
 #modelo coleccion
 class Coleccion(models.Model):
@@ -134,6 +237,9 @@ class Coleccion(models.Model):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='colecciones')
     tweets = models.ManyToManyField('Tweet', blank=True, related_name='colecciones')
     creada_en = models.DateTimeField(auto_now_add=True)
+    # Denormalizado: lo mantiene la señal m2m_changed de `tweets` y
+    # `manage.py reconcile_counters` corrige cualquier desfase.
+    tweet_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.nombre} - {self.usuario.username}"
@@ -0,0 +1,222 @@
+"""
+Notificaciones asíncronas y agrupadas.
+
+Las vistas llaman a ``notify()``, que solo encola el evento (al confirmarse
+la transacción en curso, así que una acción deshecha no notifica). Un hilo
+de fondo vacía la cola por lotes: junta los eventos repetidos (mismo
+destinatario, verbo y tweet) en una sola fila "X y N más", la suma a la
+notificación sin leer que ya exista y escribe todo con ``bulk_create`` /
+``bulk_update``. Lo pendiente se escribe al cerrar el proceso (``atexit``).
+Cada fila guarda los actores distintos que ya contó (``actor_ids``), así que
+un actor que repite (like, unlike, like) no vuelve a sumar al "N más".
+
+Cada ``UserProfile`` lleva la cuenta de notificaciones sin leer: se suma al
+crear filas nuevas y vuelve a 0 con ``mark_all_read()``. El badge la lee del
+caché (``unread_count()``, por ``TWITTOR_UNREAD_CACHE_TIMEOUT`` segundos),
+así que ninguna página hace un ``COUNT``.
+
+Con ``TWITTOR_NOTIFICATIONS_ASYNC = False`` se escribe en la misma petición
+(útil en scripts y pruebas).
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter, defaultdict, namedtuple
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Notification, UserProfile
+
+logger = logging.getLogger(__name__)
+
+LIKE = 'le gustó tu publicación'
+COMMENT = 'comentó tu publicación'
+RETWEET = 'retwitteó tu publicación'
+QUOTE = 'citó tu publicación'
+FOLLOW = 'comenzó a seguirte'
+
+BATCH_SIZE = getattr(settings, 'TWITTOR_NOTIFICATIONS_BATCH', 500)
+# Cuánto espera el hilo a que lleguen más eventos antes de escribir un lote
+FLUSH_INTERVAL = getattr(settings, 'TWITTOR_NOTIFICATIONS_INTERVAL', 0.5)
+# El badge cacheado caduca: con un caché por proceso (LocMem) y varios workers,
+# lo que otro proceso cambió (p. ej. marcar como leídas) se ve a lo sumo así de tarde
+UNREAD_TIMEOUT = getattr(settings, 'TWITTOR_UNREAD_CACHE_TIMEOUT', 60)
+
+Event = namedtuple('Event', 'actor_id recipient_id verb tweet_id created_at')
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+_STOP = object()
+
+
+def notify(actor, recipient, verb, tweet=None):
+    """
+    Encola una notificación de ``actor`` para ``recipient`` (nunca a uno mismo)
+    cuando la transacción en curso confirma: si la acción se deshace, no hay
+    notificación.
+    """
+    if actor.pk == recipient.pk:
+        return
+    event = Event(actor.pk, recipient.pk, verb, tweet.pk if tweet else None, timezone.now())
+    transaction.on_commit(lambda: _enqueue(event))
+
+
+def _enqueue(event):
+    if not getattr(settings, 'TWITTOR_NOTIFICATIONS_ASYNC', True):
+        write_batch([event])
+        return
+    _ensure_worker()
+    _queue.put(event)
+
+
+def flush():
+    """Espera a que se escriba todo lo encolado hasta ahora."""
+    if _worker is not None and _worker.is_alive():
+        _queue.join()
+
+
+def _unread_key(user_id):
+    return f'notif:unread:{user_id}'
+
+
+def unread_count(user):
+    """Notificaciones sin leer de ``user``: del caché o, si no está, de su perfil."""
+    key = _unread_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = UserProfile.objects.filter(user_id=user.pk).values_list('unread_notifications', flat=True).first() or 0
+        cache.set(key, count, UNREAD_TIMEOUT)
+    return count
+
+
+def mark_all_read(user):
+    """Marca todas las notificaciones de ``user`` como leídas con un solo UPDATE."""
+    with transaction.atomic():
+        Notification.objects.filter(recipient=user, read=False).update(read=True)
+        UserProfile.objects.filter(user=user).update(unread_notifications=0)
+    cache.set(_unread_key(user.pk), 0, UNREAD_TIMEOUT)
+
+
+def _add_unread(new):
+    """Suma las filas nuevas al contador de cada destinatario (un UPDATE por cantidad)."""
+    by_amount = defaultdict(list)
+    for recipient_id, amount in Counter(n.recipient_id for n in new).items():
+        by_amount[amount].append(recipient_id)
+    for amount, recipient_ids in by_amount.items():
+        UserProfile.objects.filter(user_id__in=recipient_ids).update(
+            unread_notifications=F('unread_notifications') + amount
+        )
+    keys = [_unread_key(recipient_id) for ids in by_amount.values() for recipient_id in ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def write_batch(events):
+    """
+    Escribe ``events`` agrupados: una fila por (destinatario, verbo, tweet)
+    con el actor más reciente y cuántos otros actores hubo. Si ya hay una
+    notificación igual sin leer, se actualiza en vez de crear otra.
+    """
+    groups = {}
+    for e in sorted(events, key=attrgetter('created_at')):
+        actors = groups.setdefault((e.recipient_id, e.verb, e.tweet_id), {})
+        actors.pop(e.actor_id, None)
+        actors[e.actor_id] = e.created_at  # el último en actuar queda al final
+    if not groups:
+        return
+
+    tweet_ids = {key[2] for key in groups}
+    same_tweet = Q(tweet_id__in=tweet_ids - {None})
+    if None in tweet_ids:
+        same_tweet |= Q(tweet__isnull=True)
+    existing = {
+        (n.recipient_id, n.verb, n.tweet_id): n
+        for n in Notification.objects.filter(
+            same_tweet,
+            read=False,
+            recipient_id__in={key[0] for key in groups},
+            verb__in={key[1] for key in groups},
+        ).order_by('created_at')
+    }
+
+    new, updated = [], []
+    for key, actors in groups.items():
+        actor_id, created_at = next(reversed(actors.items()))
+        n = existing.get(key)
+        if n is None:
+            new.append(Notification(
+                actor_id=actor_id, recipient_id=key[0], verb=key[1], tweet_id=key[2],
+                created_at=created_at, others_count=len(actors) - 1, actor_ids=sorted(actors),
+            ))
+        else:
+            # Solo suman los actores que la fila todavía no contaba (like, unlike y
+            # like de nuevo no es "uno más"); las filas de antes de actor_ids
+            # conocen solo a su último actor
+            known = set(n.actor_ids) or {n.actor_id}
+            fresh = actors.keys() - known
+            n.actor_id, n.created_at = actor_id, created_at
+            n.others_count += len(fresh)
+            n.actor_ids = sorted(known | fresh)
+            updated.append(n)
+
+    with transaction.atomic():
+        Notification.objects.bulk_create(new, batch_size=BATCH_SIZE)
+        _add_unread(new)
+        Notification.objects.bulk_update(updated, ['actor', 'created_at', 'others_count', 'actor_ids'], batch_size=BATCH_SIZE)
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='twittor-notifications', daemon=True)
+            _worker.start()
+
+
+def _next_batch():
+    """Bloquea hasta el primer evento y junta los que lleguen en ``FLUSH_INTERVAL``."""
+    batch = [_queue.get()]
+    deadline = time.monotonic() + FLUSH_INTERVAL
+    while batch[-1] is not _STOP and len(batch) < BATCH_SIZE:
+        try:
+            batch.append(_queue.get(timeout=max(0, deadline - time.monotonic())))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _run():
+    stopping = False
+    while not stopping:
+        batch = _next_batch()
+        events = [e for e in batch if e is not _STOP]
+        stopping = len(events) < len(batch)
+        try:
+            close_old_connections()
+            write_batch(events)
+        except Exception:
+            logger.exception('No se pudieron guardar %d notificaciones', len(events))
+        finally:
+            # Como al final de una petición: con CONN_MAX_AGE=0 el hilo no se
+            # queda con la conexión abierta (ni con el WAL de SQLite) entre lotes
+            close_old_connections()
+            for _ in batch:
+                _queue.task_done()
+    connection.close()
+
+
+@atexit.register
+def _shutdown(timeout=5):
+    """Escribe lo pendiente antes de que el intérprete mate el hilo."""
+    if _worker is not None and _worker.is_alive():
+        _queue.put(_STOP)
+        _worker.join(timeout)
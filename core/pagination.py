@@ -0,0 +1,109 @@
+"""
+Paginación por cursor (keyset) para los feeds.
+
+En lugar de ``OFFSET``, cada página continúa a partir de la última fila vista
+usando la pareja ``(created_at, id)``. El costo de una página no depende de
+cuán profundo haya llegado el usuario con el scroll.
+"""
+import base64
+import binascii
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+PER_PAGE = 20
+
+
+class CursorPage:
+    """Una página de resultados y el cursor para pedir la siguiente."""
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+class CursorPaginator:
+    """
+    Pagina ``queryset`` en orden descendente por ``keys``.
+
+    ``keys`` debe terminar en una columna única (normalmente el id) para que
+    el orden sea total. Por ejemplo ``('created_at', 'id')`` para ``Tweet`` o
+    ``('created_at', 'tweet_id')`` para las tablas materializadas.
+    """
+
+    def __init__(self, queryset, per_page=PER_PAGE, keys=('created_at', 'id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.keys = tuple(keys)
+
+    def encode(self, obj):
+        parts = []
+        for key in self.keys:
+            value = getattr(obj, key)
+            parts.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        raw = '|'.join(parts)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            parts = raw.split('|')
+            if len(parts) != len(self.keys):
+                raise ValueError(cursor)
+            opts = self.queryset.model._meta
+            return [opts.get_field(key).to_python(part) for key, part in zip(self.keys, parts)]
+        except (ValueError, UnicodeDecodeError, binascii.Error, ValidationError):
+            raise Http404('Cursor inválido')
+
+    def _after(self, values):
+        # k1 <= v1 AND ((k1 < v1) OR (k1 = v1 AND k2 < v2) OR ...)
+        # El primer término es redundante, pero sin él SQLite no puede usar el
+        # índice para saltar al cursor y recorre todas las filas anteriores.
+        condition = Q()
+        for i, key in enumerate(self.keys):
+            step = Q(**{f'{key}__lt': values[i]})
+            for prev_key, prev_value in zip(self.keys[:i], values[:i]):
+                step &= Q(**{prev_key: prev_value})
+            condition |= step
+        return Q(**{f'{self.keys[0]}__lte': values[0]}) & condition
+
+    def page_queryset(self, cursor=None):
+        """Consulta de una página (con una fila extra para saber si hay siguiente)."""
+        qs = self.queryset.order_by(*(f'-{key}' for key in self.keys))
+        if cursor:
+            qs = qs.filter(self._after(self.decode(cursor)))
+        return qs[:self.per_page + 1]
+
+    def _page(self, rows):
+        next_cursor = self.encode(rows[self.per_page - 1]) if len(rows) > self.per_page else None
+        return CursorPage(rows[:self.per_page], next_cursor)
+
+    def page(self, cursor=None):
+        return self._page(list(self.page_queryset(cursor)))
+
+    async def apage(self, cursor=None):
+        """Igual que ``page()`` pero con el ORM async (para las vistas ``async def``)."""
+        return self._page([row async for row in self.page_queryset(cursor)])
+
+
+def paginate(request, queryset, keys=('created_at', 'id'), per_page=PER_PAGE):
+    """Atajo para las vistas: toma el cursor de ``?cursor=``."""
+    return CursorPaginator(queryset, per_page=per_page, keys=keys).page(request.GET.get('cursor'))
+
+
+async def apaginate(request, queryset, keys=('created_at', 'id'), per_page=PER_PAGE):
+    return await CursorPaginator(queryset, per_page=per_page, keys=keys).apage(request.GET.get('cursor'))
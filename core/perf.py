@@ -0,0 +1,160 @@
+"""
+Métricas de rendimiento por petición.
+
+``PerformanceMiddleware`` (en ``core.middleware``) abre un ``RequestStats``
+por petición y lo deja en un ``ContextVar``:
+
+- las consultas SQL se miden con un ``execute_wrapper`` que cada conexión
+  (primario y réplicas) recibe al abrirse; lee el ``ContextVar``, así que
+  también mide lo que las vistas async corren en ``sync_to_async``;
+- el render de plantillas lo mide el backend ``TimedDjangoTemplates`` (solo
+  el render exterior, para no contar dos veces los ``include`` y las tarjetas);
+- el tiempo total es el de toda la cadena de middlewares y la vista.
+
+Con ``TWITTOR_SERVER_TIMING`` (por defecto igual a ``DEBUG``) se devuelven en
+la cabecera ``Server-Timing``, que el navegador muestra en la pestaña Red.
+Las peticiones que tardan más de ``TWITTOR_SLOW_REQUEST_MS`` se registran en
+el logger ``core.perf`` como una línea JSON con las
+``TWITTOR_SLOW_REQUEST_TOP_SQL`` consultas más lentas.
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+logger = logging.getLogger(__name__)
+
+_stats = ContextVar('twittor_request_stats', default=None)
+
+
+def server_timing_enabled():
+    return getattr(settings, 'TWITTOR_SERVER_TIMING', settings.DEBUG)
+
+
+def slow_request_ms():
+    return getattr(settings, 'TWITTOR_SLOW_REQUEST_MS', 500)
+
+
+def top_sql_count():
+    return getattr(settings, 'TWITTOR_SLOW_REQUEST_TOP_SQL', 5)
+
+
+class RequestStats:
+    """Lo medido en la petición en curso (tiempos en segundos)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = None
+        self.queries = []  # (duración, alias, sql)
+        self.template_time = 0.0
+        self._template_depth = 0
+
+    @property
+    def sql_time(self):
+        return sum((duration for duration, _, _ in self.queries), 0.0)
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def slowest(self, n):
+        return sorted(self.queries, key=lambda q: q[0], reverse=True)[:n]
+
+    def server_timing(self):
+        return ', '.join([
+            f'sql;dur={self.sql_time * 1000:.1f};desc="{len(self.queries)} consultas"',
+            f'tpl;dur={self.template_time * 1000:.1f};desc="plantillas"',
+            f'total;dur={self.total * 1000:.1f};desc="total"',
+        ])
+
+    def as_log(self, request, response, top):
+        match = getattr(request, 'resolver_match', None)
+        return json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(self.total * 1000, 1),
+            'sql_ms': round(self.sql_time * 1000, 1),
+            'sql_count': len(self.queries),
+            'tpl_ms': round(self.template_time * 1000, 1),
+            'top_sql': [
+                {'ms': round(duration * 1000, 2), 'db': alias, 'sql': sql[:500]}
+                for duration, alias, sql in self.slowest(top)
+            ],
+        }, ensure_ascii=False)
+
+
+def current():
+    """``RequestStats`` de la petición en curso, o ``None`` fuera de una petición medida."""
+    return _stats.get()
+
+
+def _time_query(execute, sql, params, many, context):
+    stats = _stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries.append((time.perf_counter() - started, context['connection'].alias, sql))
+
+
+def install(connection):
+    """Deja el medidor de consultas en la conexión (``connection_created``)."""
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+@contextmanager
+def measure():
+    """Mide lo que pase dentro del bloque; cede el ``RequestStats``."""
+    stats = RequestStats()
+    token = _stats.set(stats)
+    try:
+        yield stats
+    finally:
+        stats.finish()
+        _stats.reset(token)
+
+
+def report(stats, request, response):
+    """Pone la cabecera ``Server-Timing`` y registra la petición si fue lenta."""
+    if server_timing_enabled():
+        response['Server-Timing'] = stats.server_timing()
+    if stats.total * 1000 >= slow_request_ms():
+        logger.warning('petición lenta %s', stats.as_log(request, response, top_sql_count()))
+    return response
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = _stats.get()
+        if stats is None:
+            return super().render(context, request)
+        stats._template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats._template_depth -= 1
+            if not stats._template_depth:
+                stats.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """``DjangoTemplates`` que suma el tiempo de render al ``RequestStats`` en curso."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
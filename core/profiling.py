@@ -0,0 +1,181 @@
+"""
+Perfilado de peticiones en producción, a pedido.
+
+``ProfilingMiddleware`` (en ``core.middleware``) perfila una petición cuando:
+
+- trae la cabecera ``X-Twittor-Profile`` con un token firmado (``token()`` o
+  ``manage.py profile_report --token``), válido ``TWITTOR_PROFILE_TOKEN_MAX_AGE``
+  segundos; o
+- cae en la muestra aleatoria ``TWITTOR_PROFILE_SAMPLE_RATE`` (0 a 1, por
+  defecto 0: apagado).
+
+De cada petición perfilada se guardan dos archivos en ``TWITTOR_PROFILE_DIR``
+con el nombre de la ruta en el nombre del archivo:
+
+- ``.prof``: estadísticas de ``cProfile`` (formato de ``pstats``);
+- ``.collapsed``: muestras de la pila cada ``TWITTOR_PROFILE_INTERVAL_MS``
+  en formato "colapsado" (``a;b;c N``) de flamegraph.pl / speedscope.
+
+El directorio rota: solo quedan los ``TWITTOR_PROFILE_KEEP`` más recientes.
+``manage.py profile_report`` los junta por nombre de ruta.
+
+Solo se perfila una petición a la vez (cProfile no admite dos perfiladores
+activos); las demás siguen sin perfilar. En ASGI se perfila el hilo del
+event loop, así que lo que una vista async corre en ``sync_to_async`` queda
+fuera: para eso conviene perfilar la ruta bajo WSGI.
+"""
+import cProfile
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core import signing
+
+HEADER = 'X-Twittor-Profile'
+SALT = 'twittor.profiling'
+PROF_SUFFIX = '.prof'
+STACKS_SUFFIX = '.collapsed'
+
+# Un solo perfilador a la vez en todo el proceso
+_busy = threading.Lock()
+
+
+def profile_dir():
+    return getattr(settings, 'TWITTOR_PROFILE_DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+
+
+def sample_rate():
+    return getattr(settings, 'TWITTOR_PROFILE_SAMPLE_RATE', 0.0)
+
+
+def keep():
+    return getattr(settings, 'TWITTOR_PROFILE_KEEP', 200)
+
+
+def interval():
+    return getattr(settings, 'TWITTOR_PROFILE_INTERVAL_MS', 5) / 1000
+
+
+def token_max_age():
+    return getattr(settings, 'TWITTOR_PROFILE_TOKEN_MAX_AGE', 60 * 60)
+
+
+def token():
+    """Valor firmado para la cabecera ``X-Twittor-Profile``."""
+    return signing.TimestampSigner(salt=SALT).sign('profile')
+
+
+def requested(request):
+    """¿Hay que perfilar esta petición?"""
+    value = request.headers.get(HEADER)
+    if value:
+        try:
+            signing.TimestampSigner(salt=SALT).unsign(value, max_age=token_max_age())
+            return True
+        except signing.BadSignature:
+            pass
+    rate = sample_rate()
+    return rate > 0 and random.random() < rate
+
+
+def _frame_name(code):
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def collapse(frame):
+    """Pila de ``frame`` en formato colapsado: de la raíz a la hoja, separada por ``;``."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code).replace(';', ':'))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler(threading.Thread):
+    """Hilo que cuenta las pilas de ``thread_id`` cada ``interval`` segundos."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='twittor-profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+class Capture:
+    """Lo capturado en una petición perfilada."""
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), interval())
+
+
+@contextmanager
+def capture():
+    """Perfila el bloque; cede un ``Capture`` o ``None`` si ya hay otra petición perfilándose."""
+    if not _busy.acquire(blocking=False):
+        yield None
+        return
+    try:
+        result = Capture()
+        result.sampler.start()
+        result.profiler.enable()
+        try:
+            yield result
+        finally:
+            result.profiler.disable()
+            result.sampler.stop()
+    finally:
+        _busy.release()
+
+
+def _slug(name):
+    return re.sub(r'[^\w-]+', '-', name or 'sin-ruta').strip('-') or 'sin-ruta'
+
+
+def url_name_of(filename):
+    """Nombre de ruta guardado en el nombre de un archivo de perfil."""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return stem.split('__', 2)[-1]
+
+
+def save(result, request):
+    """Escribe los archivos de la petición y rota el directorio; devuelve la ruta del ``.prof``."""
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    match = getattr(request, 'resolver_match', None)
+    stem = os.path.join(directory, f'{time.time_ns()}__{os.getpid()}__{_slug(match.view_name if match else None)}')
+    result.profiler.dump_stats(stem + PROF_SUFFIX)
+    with open(stem + STACKS_SUFFIX, 'w', encoding='utf-8') as f:
+        for stack, count in result.sampler.stacks.items():
+            f.write(f'{stack} {count}\n')
+    rotate(directory)
+    return stem + PROF_SUFFIX
+
+
+def rotate(directory):
+    """Borra los perfiles más viejos hasta dejar ``TWITTOR_PROFILE_KEEP``."""
+    profiles = sorted(name for name in os.listdir(directory) if name.endswith(PROF_SUFFIX))
+    for name in profiles[:max(0, len(profiles) - keep())]:
+        stem = os.path.join(directory, name[:-len(PROF_SUFFIX)])
+        for suffix in (PROF_SUFFIX, STACKS_SUFFIX):
+            try:
+                os.remove(stem + suffix)
+            except FileNotFoundError:
+                pass
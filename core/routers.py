@@ -0,0 +1,77 @@
+"""
+Router de base de datos con réplicas de lectura.
+
+Las escrituras van siempre al primario (``default``). Las lecturas de los
+modelos de ``core`` (feeds, búsqueda, perfiles) se reparten entre las réplicas
+de ``settings.TWITTOR_DB_REPLICAS``, salvo que haya que leer lo recién escrito:
+
+- en peticiones que no son GET/HEAD/OPTIONS, y en las demás después de la
+  primera escritura (o dentro de una transacción del primario);
+- en las peticiones siguientes del mismo navegador durante
+  ``TWITTOR_REPLICA_STICKY_SECONDS`` (cookie que pone ``StickyPrimaryMiddleware``),
+  lo que tarda una réplica en ponerse al día.
+
+Sesiones y usuarios se leen siempre del primario (un login recién hecho no
+puede esperar a la réplica), igual que todo lo que corre fuera de una
+petición: comandos, el hilo de notificaciones, callbacks de imágenes.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+PRIMARY = 'default'
+PRIMARY_APPS = {'admin', 'auth', 'contenttypes', 'sessions'}
+COOKIE = 'twittor_primary'
+
+
+class RequestState:
+    """Lo que el router sabe de la petición en curso."""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned  # POST, o trae la cookie de una escritura reciente
+        self.wrote = False
+
+
+_state = ContextVar('twittor_db_state', default=None)
+
+
+def replicas():
+    return getattr(settings, 'TWITTOR_DB_REPLICAS', [])
+
+
+def begin_request(pinned):
+    """Empieza a rutear la petición en curso; devuelve el token para ``end_request``."""
+    return _state.set(RequestState(pinned))
+
+
+def end_request(token):
+    """Termina la petición y devuelve su ``RequestState``."""
+    state = _state.get()
+    _state.reset(token)
+    return state
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.pinned or state.wrote or not replicas():
+            return PRIMARY
+        if model._meta.app_label in PRIMARY_APPS or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return random.choice(replicas())
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primario y réplicas tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Las réplicas se copian del primario con `manage.py sync_replicas`
+        return db == PRIMARY
@@ -0,0 +1,116 @@
+"""
+Backends de búsqueda de tweets.
+
+El backend activo se elige con ``settings.TWITTOR_SEARCH_BACKEND`` (ruta a la
+clase). Por defecto se usa una tabla virtual FTS5 de SQLite, sincronizada por
+señales, con resultados ordenados por relevancia (bm25) y coincidencia por
+prefijo. En otros motores se cae a ``ContainsBackend`` (``icontains``).
+"""
+import re
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections, router
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .cards import acards_for_ids, cards_for_ids
+from .models import Tweet
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+class BaseSearchBackend:
+    """Interfaz mínima: mantener el índice y devolver ids ordenados por relevancia."""
+
+    def index(self, tweet):
+        pass
+
+    def remove(self, tweet_id):
+        pass
+
+    def rebuild(self):
+        """Reconstruye el índice completo. Devuelve cuántos tweets quedaron indexados."""
+        return 0
+
+    def search(self, query, limit=50):
+        raise NotImplementedError
+
+
+class ContainsBackend(BaseSearchBackend):
+    """Comportamiento original: ``icontains`` sobre contenido y username (sin índice)."""
+
+    def search(self, query, limit=50):
+        return list(
+            Tweet.objects.filter(Q(content__icontains=query) | Q(user__username__icontains=query), is_retweet=False)
+            .values_list('id', flat=True)[:limit]
+        )
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """Tabla virtual FTS5 ``core_tweet_fts`` con ``rowid = tweet.id``."""
+
+    table = 'core_tweet_fts'
+
+    def index(self, tweet):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [tweet.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, body, username) VALUES (%s, %s, %s)',
+                [tweet.pk, tweet.content, tweet.user.username],
+            )
+
+    def remove(self, tweet_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [tweet_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, body, username) '
+                f'SELECT t.id, t.content, u.username FROM {Tweet._meta.db_table} t '
+                f'JOIN auth_user u ON u.id = t.user_id WHERE NOT t.is_retweet'
+            )
+            cursor.execute(f'SELECT count(*) FROM {self.table}')
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def to_match(query):
+        """``'djan tail'`` → ``'"djan"* "tail"*'`` (todas las palabras, por prefijo)."""
+        return ' '.join(f'"{token}"*' for token in TOKEN_RE.findall(query))
+
+    def search(self, query, limit=50):
+        match = self.to_match(query)
+        if not match:
+            return []
+        # Lectura: puede ir a una réplica (ver core.routers)
+        with connections[router.db_for_read(Tweet)].cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}), rowid DESC LIMIT %s',
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    path = getattr(settings, 'TWITTOR_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    return ContainsBackend()
+
+
+def search_tweets(query, limit=50, viewer=None):
+    """Tweets que coinciden con ``query``, en orden de relevancia."""
+    return cards_for_ids(get_backend().search(query, limit=limit), viewer)
+
+
+async def asearch_tweets(query, limit=50, viewer=None):
+    """``search_tweets`` para vistas async: el backend usa un cursor crudo, así que corre en un hilo."""
+    ids = await sync_to_async(get_backend().search)(query, limit=limit)
+    return await acards_for_ids(ids, viewer)
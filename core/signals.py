@@ -1,9 +1,160 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import UserProfile
+from .models import Coleccion, Follow, MiembroDeLista, Tweet, UserProfile
+from . import counters, follows, fragments, hashtags, images, list_feeds, live, perf, sqlite, timelines
+from .search import get_backend
+
+# --- Ajustes de SQLite en cada conexión nueva ---
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        sqlite.configure(connection)
+
+# --- Métricas por petición (Server-Timing) ---
+@receiver(connection_created)
+def time_connection_queries(sender, connection, **kwargs):
+    perf.install(connection)
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
+
+# --- Timeline materializado ---
+@receiver(post_save, sender=Tweet)
+def fan_out_tweet(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timelines.fan_out(instance)
+
+# --- Índice de hashtags ---
+@receiver(post_save, sender=Tweet)
+def index_tweet_hashtags(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        hashtags.index_tweets([instance])
+
+# --- Índice de búsqueda ---
+@receiver(post_save, sender=Tweet)
+def index_tweet_search(sender, instance, raw=False, **kwargs):
+    # Los retuits no tienen texto propio: se encuentra el original
+    if not raw and not instance.is_retweet:
+        get_backend().index(instance)
+
+# --- Retuits: filas sin texto que muestran el original ---
+@receiver(pre_delete, sender=Tweet)
+def delete_retweets(sender, instance, **kwargs):
+    # Antes de que SET_NULL los deje huérfanos (y vacíos)
+    Tweet.objects.filter(parent_id=instance.pk, is_retweet=True).delete()
+
+@receiver(post_delete, sender=Tweet)
+def remove_tweet_search(sender, instance, **kwargs):
+    get_backend().remove(instance.pk)
+
+@receiver(post_save, sender=Follow)
+def merge_followed_tweets(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timelines.merge_author(instance.follower_id, instance.following_id)
+
+@receiver(post_delete, sender=Follow)
+def evict_unfollowed_tweets(sender, instance, **kwargs):
+    timelines.evict_author(instance.follower_id, instance.following_id)
+
+# --- Grafo de seguidores en caché ---
+@receiver(post_save, sender=Follow)
+def patch_follow_graph(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        follows.followed(instance.follower_id, instance.following_id)
+
+@receiver(post_delete, sender=Follow)
+def unpatch_follow_graph(sender, instance, **kwargs):
+    follows.unfollowed(instance.follower_id, instance.following_id)
+
+# --- Feeds materializados de listas ---
+@receiver(post_save, sender=Tweet)
+def fan_out_list_tweet(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        list_feeds.fan_out(instance)
+
+@receiver(post_save, sender=MiembroDeLista)
+def merge_member_tweets(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        list_feeds.merge_member(instance.lista_id, instance.usuario_id)
+
+@receiver(post_delete, sender=MiembroDeLista)
+def evict_member_tweets(sender, instance, **kwargs):
+    list_feeds.evict_member(instance.lista_id, instance.usuario_id)
+
+# --- Tweets guardados por colección (Coleccion.tweet_count) ---
+@receiver(m2m_changed, sender=Coleccion.tweets.through)
+def count_coleccion_tweets(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # tweet.colecciones.clear(): después ya no se sabe de qué colecciones salió
+        instance._cleared_colecciones = list(instance.colecciones.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear') or (action != 'post_clear' and not pk_set):
+        return
+    if not reverse:
+        ids = [instance.pk]
+    elif action == 'post_clear':
+        ids = instance.__dict__.pop('_cleared_colecciones', [])
+    else:
+        ids = pk_set
+    counters.recount_colecciones(list(ids))
+
+@receiver(pre_delete, sender=Tweet)
+def remember_tweet_colecciones(sender, instance, **kwargs):
+    # El borrado en cascada de las filas intermedias no manda m2m_changed
+    instance._saved_in_colecciones = list(instance.colecciones.values_list('pk', flat=True))
+
+@receiver(post_delete, sender=Tweet)
+def recount_tweet_colecciones(sender, instance, **kwargs):
+    counters.recount_colecciones(instance.__dict__.pop('_saved_in_colecciones', []))
+
+# --- Timeline en vivo ---
+@receiver(post_save, sender=Tweet)
+def publish_live_tweet(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(lambda pk=instance.pk, user_id=instance.user_id: live.publish_tweet(pk, user_id))
+
+# --- Caché de tarjetas: cambiar la versión invalida los fragmentos ---
+@receiver(post_save, sender=Tweet)
+def bump_edited_tweet_card(sender, instance, created, **kwargs):
+    if not created:
+        fragments.bump_tweet(instance.pk)
+
+@receiver(post_delete, sender=Tweet)
+def bump_deleted_tweet_card(sender, instance, **kwargs):
+    fragments.bump_tweet(instance.pk)
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=UserProfile)
+def bump_author_cards(sender, instance, update_fields=None, **kwargs):
+    # Cada login guarda solo last_login, que la tarjeta no muestra
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    fragments.bump_user(instance.pk if sender is User else instance.user_id)
+
+# --- Variantes de imágenes ---
+def _image_field(sender):
+    return 'image' if sender is Tweet else 'avatar'
+
+@receiver(pre_save, sender=Tweet)
+@receiver(pre_save, sender=UserProfile)
+def reset_image_variants(sender, instance, raw=False, **kwargs):
+    # Un archivo recién subido todavía no está guardado (_committed=False)
+    file = getattr(instance, _image_field(sender))
+    if file and not file._committed and not raw:
+        setattr(instance, f'{_image_field(sender)}_derived', False)
+
+@receiver(post_save, sender=Tweet)
+@receiver(post_save, sender=UserProfile)
+def build_image_variants(sender, instance, raw=False, **kwargs):
+    field = _image_field(sender)
+    if raw or not getattr(instance, field) or getattr(instance, f'{field}_derived'):
+        return
+    if sender is Tweet:
+        images.schedule(instance, field, lambda pk=instance.pk: fragments.bump_tweet(pk))
+    else:
+        images.schedule(instance, field, lambda user_id=instance.user_id: fragments.bump_user(user_id))
@@ -0,0 +1,57 @@
+"""
+Ajustes de SQLite para servir con varios hilos o procesos.
+
+Al abrir cada conexión (señal ``connection_created``) se aplican estos PRAGMA:
+
+- ``journal_mode = wal``: los lectores no bloquean al escritor ni al revés.
+- ``busy_timeout``: un escritor espera al otro en vez de fallar con
+  "database is locked".
+- ``synchronous = normal``: con WAL sigue siendo seguro ante caídas del
+  proceso y evita un ``fsync`` por transacción.
+- ``mmap_size``, ``cache_size`` y ``temp_store``: menos lecturas del disco.
+
+``settings.TWITTOR_SQLITE_PRAGMAS`` cambia o desactiva (``None`` o ``''``)
+cualquiera de ellos; ``settings.py`` lo arma con las variables de entorno
+``TWITTOR_SQLITE_<PRAGMA>``.
+"""
+import re
+
+from django.conf import settings
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'wal',
+    'busy_timeout': 10000,  # ms
+    'synchronous': 'normal',
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -32000,  # negativo = KiB (unos 32 MB por conexión)
+    'temp_store': 'memory',
+}
+
+_VALID = re.compile(r'-?\w+')
+
+
+def pragmas():
+    """PRAGMA a aplicar: los de por defecto con los de ``settings`` encima."""
+    merged = {**DEFAULT_PRAGMAS, **getattr(settings, 'TWITTOR_SQLITE_PRAGMAS', {})}
+    return {name: value for name, value in merged.items() if value not in (None, '')}
+
+
+def configure(connection):
+    """Aplica ``pragmas()`` a la conexión cruda de ``connection`` recién abierta."""
+    for name, value in pragmas().items():
+        if not (_VALID.fullmatch(name) and _VALID.fullmatch(str(value))):
+            raise ValueError(f'PRAGMA inválido: {name} = {value!r}')
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+    if connection.alias in getattr(settings, 'TWITTOR_DB_REPLICAS', []):
+        # Las réplicas solo se escriben con `sync_replicas` (fuera del ORM)
+        connection.connection.execute('PRAGMA query_only = ON')
+
+
+def current(connection):
+    """Valores vigentes de los PRAGMA configurables (para diagnosticar)."""
+    with connection.cursor() as cursor:
+        values = {}
+        for name in DEFAULT_PRAGMAS:
+            cursor.execute(f'PRAGMA {name}')
+            values[name] = cursor.fetchone()[0]
+        return values
@@ -1,26 +1,92 @@
-
 from django import template
 import re
+from functools import lru_cache
+from urllib.parse import quote
+from django.conf import settings
+from django.utils.http import RFC3986_SUBDELIMS
+from django.utils.html import escape, format_html
 from django.utils.safestring import mark_safe
 from django.urls import reverse
 
+from core import fragments, images
+
 register = template.Library()
 
 HASHTAG_RE = re.compile(r'(?P<tag>#\w+)')
 MENTION_RE = re.compile(r'(?P<at>@[A-Za-z0-9_\.\-]+)')
+# Un solo patrón para recorrer el texto una vez (hashtag o mención)
+TOKEN_RE = re.compile(f'{HASHTAG_RE.pattern}|{MENTION_RE.pattern}')
+
+LINK_HTML = '<a class="text-blue-600 hover:underline" href="{url}">{text}</a>'
+URL_SAFE = RFC3986_SUBDELIMS + '/~:@'  # lo mismo que deja sin escapar reverse()
+LINKIFY_CACHE_SIZE = getattr(settings, 'TWITTOR_LINKIFY_CACHE_SIZE', 4096)
+_SLOT = 'slot'
+
+
+@lru_cache(maxsize=None)
+def _url_parts(name):
+    """``'tag'`` → ``('/tag/', '/')``: se resuelve una sola vez por proceso."""
+    prefix, suffix = reverse(name, args=[_SLOT]).rsplit(_SLOT, 1)
+    return prefix, suffix
+
+
+def _link(name, value, text):
+    prefix, suffix = _url_parts(name)
+    url = prefix + quote(value, safe=URL_SAFE) + suffix
+    return LINK_HTML.format(url=escape(url), text=escape(text))
+
+
+@lru_cache(maxsize=LINKIFY_CACHE_SIZE)
+def _linkify(text):
+    out = []
+    pos = 0
+    for m in TOKEN_RE.finditer(text):
+        out.append(escape(text[pos:m.start()]))
+        if m.group('tag'):
+            out.append(_link('tag', m.group('tag')[1:], m.group('tag')))
+        else:
+            out.append(_link('profile', m.group('at')[1:], m.group('at')))
+        pos = m.end()
+    out.append(escape(text[pos:]))
+    return ''.join(out)
+
 
 @register.filter
 def linkify(text: str):
+    """Convierte #hashtags y @menciones en enlaces, escapando el resto del texto."""
     if not text:
         return ''
-    def link_tag(m):
-        tag = m.group('tag')[1:]
-        url = reverse('tag', args=[tag])
-        return f'<a class="text-blue-600 hover:underline" href="{url}">#{tag}</a>'
-    def link_mention(m):
-        user = m.group('at')[1:]
-        url = reverse('profile', args=[user])
-        return f'<a class="text-blue-600 hover:underline" href="{url}">@{user}</a>'
-    html = HASHTAG_RE.sub(link_tag, text)
-    html = MENTION_RE.sub(link_mention, html)
-    return mark_safe(html)
+    return mark_safe(_linkify(str(text)))
+
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor):
+    """URL de la página actual con ``?cursor=`` apuntando a la siguiente página."""
+    request = context['request']
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return f'{request.path}?{params.urlencode()}'
+
+
+@register.simple_tag(takes_context=True)
+def tweet_cards(context, tweets):
+    """Tarjetas de ``tweets`` servidas desde el caché de fragmentos."""
+    return fragments.render_cards(tweets, context['request'])
+
+
+@register.simple_tag
+def picture(owner, field, css='', alt='', sizes=None):
+    """
+    ``<picture>`` con ``srcset`` WebP/JPEG del ``field`` de ``owner`` (``'image'``
+    o ``'avatar'``). Mientras las variantes no existen, la imagen original.
+    """
+    file = getattr(owner, field)
+    if not getattr(owner, f'{field}_derived', False):
+        return format_html('<img src="{}" class="{}" alt="{}" loading="lazy">', file.url, css, alt)
+    sizes = sizes or images.SIZES[field]
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" class="{}" alt="{}" loading="lazy" decoding="async"></picture>',
+        images.srcset(file, field, 'webp'), sizes,
+        images.fallback_url(file, field), images.srcset(file, field, 'jpg'), sizes, css, alt,
+    )
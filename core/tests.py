@@ -0,0 +1,401 @@
+import re
+import threading
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from core import fragments, hashtags, likes, list_feeds, notifications, sqlite, timelines
+from core.cards import tweet_cards
+from core.models import Coleccion, Follow, Like, Lista, MiembroDeLista, Notification, Tweet
+from core.pagination import CursorPaginator
+from core.search import get_backend
+
+# Máximo de consultas por página de cada feed (sesión y usuario incluidos), con
+# los cachés ya calientes (badge, grafo de seguidores). La primera visita puede
+# hacer alguna consulta más para llenarlos, pero tampoco debe crecer con los datos.
+BUDGETS = {
+    "timeline": 5,
+    "explore": 4,
+    "profile": 5,
+    "tag": 5,
+    "search": 6,
+    "list_feed": 5,
+    "detalle_coleccion": 5,
+    "lista_colecciones": 4,
+    "notifications": 4,
+}
+
+
+def build_feed_data(prefix, size):
+    """Un visitante y ``size`` tweets de alguien a quien sigue; devuelve ``(visitante, urls)``."""
+    viewer = User.objects.create_user(f"{prefix}_viewer")
+    author = User.objects.create_user(f"{prefix}_author")
+    viewer.following.create(following=author)
+
+    Tweet.objects.bulk_create(Tweet(user=author, content=f"Tweet {i} #budget") for i in range(size))
+    tweets = list(Tweet.objects.filter(user=author).order_by("pk"))
+    # Un tercio son citas para ejercitar la tarjeta del tweet original
+    quotes = [Tweet(user=viewer, parent=tw, content="Cita #budget") for tw in tweets[: size // 3]]
+    Tweet.objects.bulk_create(quotes)
+    tweets += list(Tweet.objects.filter(user=viewer).order_by("pk"))
+    Like.objects.bulk_create(Like(user=viewer, tweet=tw) for tw in tweets[::2])
+    Notification.objects.bulk_create(
+        Notification(actor=author, recipient=viewer, verb="le gustó tu publicación", tweet=tw) for tw in tweets
+    )
+
+    timelines.backfill(viewer.pk)
+    hashtags.index_tweets(tweets)
+    get_backend().rebuild()
+
+    lista = Lista.objects.create(nombre=prefix, creador=viewer)
+    MiembroDeLista.objects.create(lista=lista, usuario=author)
+    coleccion = Coleccion.objects.create(nombre=prefix, usuario=viewer)
+    coleccion.tweets.add(*tweets)
+    # Muchas colecciones: la lista no debe contar los tweets de cada una
+    Coleccion.objects.bulk_create(Coleccion(nombre=f"{prefix} {i}", usuario=viewer) for i in range(size // 10))
+
+    urls = {
+        "timeline": reverse("timeline"),
+        "explore": reverse("explore"),
+        "profile": reverse("profile", args=[author.username]),
+        "tag": reverse("tag", args=["budget"]),
+        "search": reverse("search") + "?q=budget",
+        "list_feed": reverse("list_feed", args=[lista.pk]),
+        "detalle_coleccion": reverse("detalle_coleccion", args=[coleccion.pk]),
+        "lista_colecciones": reverse("lista_colecciones"),
+        "notifications": reverse("notifications"),
+    }
+    return viewer, urls
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Cada feed con 10 y con 500 tweets: la página no pasa de su presupuesto y
+    hace las mismas consultas con pocos y con muchos datos (sin N+1), tanto
+    con el caché frío como caliente.
+    """
+
+    SMALL, LARGE = 10, 500
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.small = build_feed_data("small", cls.SMALL)
+        cls.large = build_feed_data("large", cls.LARGE)
+
+    def count_queries(self, data, name):
+        """``(primera visita, segunda visita)`` de la ruta ``name``, con el caché frío al empezar."""
+        viewer, urls = data
+        cache.clear()
+        self.client.force_login(viewer)
+        counts = []
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(urls[name])
+            self.assertEqual(response.status_code, 200, urls[name])
+            counts.append(len(ctx.captured_queries))
+        return tuple(counts)
+
+    def assertWithinBudget(self, name):
+        small_cold, small_warm = self.count_queries(self.small, name)
+        large_cold, large_warm = self.count_queries(self.large, name)
+        budget = BUDGETS[name]
+        self.assertLessEqual(small_warm, budget, f"{name} con {self.SMALL} tweets")
+        self.assertLessEqual(large_warm, budget, f"{name} con {self.LARGE} tweets")
+        self.assertEqual(
+            (small_cold, small_warm), (large_cold, large_warm),
+            f"{name}: las consultas (frío, caliente) crecen con los datos (N+1)",
+        )
+
+    def test_timeline(self):
+        self.assertWithinBudget("timeline")
+
+    def test_explore(self):
+        self.assertWithinBudget("explore")
+
+    def test_profile(self):
+        self.assertWithinBudget("profile")
+
+    def test_tag(self):
+        self.assertWithinBudget("tag")
+
+    def test_search(self):
+        self.assertWithinBudget("search")
+
+    def test_list_feed(self):
+        self.assertWithinBudget("list_feed")
+
+    def test_detalle_coleccion(self):
+        self.assertWithinBudget("detalle_coleccion")
+
+    def test_lista_colecciones(self):
+        self.assertWithinBudget("lista_colecciones")
+
+    def test_notifications(self):
+        self.assertWithinBudget("notifications")
+
+
+class CardVersionTests(TestCase):
+    """Qué guardados cambian la versión de las tarjetas de un autor."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("cards_author")
+
+    def user_version(self):
+        return cache.get(fragments._user_key(self.user.pk))
+
+    def test_login_keeps_cards(self):
+        before = self.user_version()
+        self.client.force_login(self.user)
+        self.assertEqual(self.user_version(), before)
+
+    def test_profile_change_bumps_cards(self):
+        before = self.user_version()
+        self.user.username = "cards_renamed"
+        self.user.save()
+        self.assertNotEqual(self.user_version(), before)
+
+
+@override_settings(TWITTOR_NOTIFICATIONS_ASYNC=False)
+class NotifyTests(TestCase):
+    """Las notificaciones se escriben solo si la acción que las causó se confirma."""
+
+    def setUp(self):
+        self.actor = User.objects.create_user("notify_actor")
+        self.recipient = User.objects.create_user("notify_recipient")
+
+    def test_committed_action_notifies(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                notifications.notify(self.actor, self.recipient, "te siguió")
+        self.assertEqual(Notification.objects.filter(recipient=self.recipient).count(), 1)
+
+    def test_rolled_back_action_does_not_notify(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                notifications.notify(self.actor, self.recipient, "te siguió")
+                raise IntegrityError("retuit repetido")
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Notification.objects.filter(recipient=self.recipient).exists())
+
+
+def run_concurrently(workers, target):
+    """Corre ``target(n)`` en ``workers`` hilos que arrancan a la vez; devuelve los errores por mensaje."""
+    errors = Counter()
+    lock = threading.Lock()
+    start_line = threading.Barrier(workers)
+
+    def worker(n):
+        start_line.wait()
+        try:
+            target(n)
+        except Exception as exc:
+            with lock:
+                errors[f"{type(exc).__name__}: {exc}"] += 1
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+class LikeConcurrencyTests(TransactionTestCase):
+    """
+    Muchos clics simultáneos de los mismos usuarios en el mismo tweet (hilos
+    con su propia conexión, transacciones reales): sin errores, ``like_count``
+    igual a la tabla de likes y cada usuario en el estado que le toca.
+    """
+
+    USERS, CLICKS, ROUNDS = 8, 3, 5
+
+    def setUp(self):
+        author = User.objects.create_user("likes_author")
+        self.users = [User.objects.create_user(f"likes_{n}") for n in range(self.USERS)]
+        self.tweet = Tweet.objects.create(user=author, content="Dale like")
+
+    def hammer(self, liked):
+        """``CLICKS`` hilos por usuario, cada uno con ``ROUNDS`` llamadas a ``set_like``."""
+        def clicks(n):
+            user = self.users[n % self.USERS]
+            for _ in range(self.ROUNDS):
+                likes.set_like(user.pk, self.tweet.pk, liked)
+
+        self.assertEqual(run_concurrently(self.USERS * self.CLICKS, clicks), Counter())
+
+    def assertLikedBy(self, expected):
+        like_count = Tweet.objects.values_list("like_count", flat=True).get(pk=self.tweet.pk)
+        liked_ids = set(Like.objects.filter(tweet=self.tweet).values_list("user_id", flat=True))
+        self.assertEqual(like_count, Like.objects.filter(tweet=self.tweet).count())
+        self.assertEqual(liked_ids, {u.pk for u in expected})
+
+    def test_toggle(self):
+        # Cada usuario alterna CLICKS × ROUNDS veces: termina con like si el total es impar
+        self.hammer(liked=None)
+        self.assertLikedBy(self.users if self.CLICKS * self.ROUNDS % 2 else [])
+        self.hammer(liked=None)
+        self.assertLikedBy([])
+
+    def test_set_like_is_idempotent(self):
+        self.hammer(liked=True)
+        self.assertLikedBy(self.users)
+        self.hammer(liked=False)
+        self.assertLikedBy([])
+
+    def test_mixed_toggle_and_set(self):
+        # Alternar y pedir estado a la vez: el estado final depende del orden,
+        # pero el contador siempre coincide con la tabla
+        def clicks(n):
+            user = self.users[n % self.USERS]
+            for _ in range(self.ROUNDS):
+                likes.set_like(user.pk, self.tweet.pk, None if n % 2 else True)
+
+        self.assertEqual(run_concurrently(self.USERS * self.CLICKS, clicks), Counter())
+        like_count = Tweet.objects.values_list("like_count", flat=True).get(pk=self.tweet.pk)
+        self.assertEqual(like_count, Like.objects.filter(tweet=self.tweet).count())
+        self.hammer(liked=True)
+        self.assertLikedBy(self.users)
+
+
+@skipUnlessDBFeature("supports_transactions")
+class SqliteWriteConcurrencyTests(TransactionTestCase):
+    """
+    Varios hilos publican y dan likes a la vez por las vistas, sobre la base de
+    pruebas en archivo y con los PRAGMA de ``core.sqlite``: ningún escritor
+    falla con "database is locked".
+    """
+
+    WRITERS, OPS = 8, 20
+
+    def setUp(self):
+        if connection.vendor != "sqlite" or connection.is_in_memory_db():
+            self.skipTest("solo SQLite en archivo (WAL no existe en memoria)")
+        self.users = [User.objects.create_user(f"writer_{n}") for n in range(self.WRITERS)]
+        Tweet.objects.bulk_create(Tweet(user=user, content="Para likes") for user in self.users)
+        self.tweet_ids = list(Tweet.objects.values_list("pk", flat=True))
+
+    def test_pragmas_applied(self):
+        self.assertEqual(sqlite.current(connection)["journal_mode"], sqlite.DEFAULT_PRAGMAS["journal_mode"])
+
+    def test_concurrent_writers_never_lock(self):
+        def writes(n):
+            client = Client()
+            client.force_login(self.users[n])
+            for i in range(self.OPS):
+                if i % 4 == 0:
+                    response = client.post(reverse("timeline"), {"content": f"Escritor {n}-{i} #stress"})
+                else:
+                    tweet_id = self.tweet_ids[(n + i) % len(self.tweet_ids)]
+                    response = client.post(reverse("like_toggle", args=[tweet_id]))
+                self.assertLess(response.status_code, 400)
+
+        self.assertEqual(run_concurrently(self.WRITERS, writes), Counter())
+        notifications.flush()
+        self.assertEqual(Tweet.objects.filter(content__startswith="Escritor").count(), self.WRITERS * self.OPS // 4)
+        for tweet in Tweet.objects.filter(pk__in=self.tweet_ids):
+            self.assertEqual(tweet.like_count, tweet.likes.count())
+
+
+# "SCAN core_tweet" (o "SCAN TABLE core_tweet [AS U0]" antes de SQLite 3.36)
+# sin "USING ... INDEX": la tabla se lee completa
+FULL_SCAN = re.compile(r"\bSCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+# Toda consulta lee al menos una tabla: si ninguna línea lo dice, el formato
+# del plan cambió y FULL_SCAN podría no estar viendo nada
+TABLE_ACCESS = re.compile(r"\b(?:SCAN|SEARCH) ")
+TEMP_SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+
+@skipUnlessDBFeature("supports_explaining_query_execution")
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN QUERY PLAN de la consulta de cada feed (primera página y con
+    cursor) y de las búsquedas calientes, sobre filas guardadas: ninguna
+    recorre una tabla completa ni ordena en una tabla temporal.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create_user("plans_viewer")
+        author = User.objects.create_user("plans_author")
+        Follow.objects.create(follower=cls.viewer, following=author)
+        Tweet.objects.bulk_create(Tweet(user=author, content=f"Tweet {i} #django") for i in range(30))
+        cls.tweets = list(Tweet.objects.order_by("pk"))
+        Tweet.objects.create(user=cls.viewer, parent=cls.tweets[0], is_retweet=True, content="")
+        Notification.objects.bulk_create(
+            Notification(actor=author, recipient=cls.viewer, verb="le gustó tu publicación", tweet=tw)
+            for tw in cls.tweets
+        )
+        cls.lista = Lista.objects.create(nombre="plans", creador=cls.viewer)
+        MiembroDeLista.objects.create(lista=cls.lista, usuario=author)
+        cls.coleccion = Coleccion.objects.create(nombre="plans", usuario=cls.viewer)
+        cls.coleccion.tweets.add(*cls.tweets)
+        timelines.backfill(cls.viewer.pk)
+        list_feeds.backfill(cls.lista.pk)
+        hashtags.index_tweets(cls.tweets)
+
+    def assertIndexed(self, queryset, sort_ok=False):
+        plan = queryset.explain()
+        lines = plan.splitlines()
+        self.assertTrue(any(TABLE_ACCESS.search(line) for line in lines), f"formato de plan desconocido:\n{plan}")
+        for line in lines:
+            self.assertIsNone(FULL_SCAN.search(line), f"recorre una tabla completa:\n{plan}")
+            if not sort_ok:
+                self.assertNotIn(TEMP_SORT, line, f"ordena en una tabla temporal:\n{plan}")
+
+    def assertPagesIndexed(self, queryset, keys=("created_at", "id"), sort_ok=False):
+        """La primera página y la que sigue a una fila real, como las pide ``paginate()``."""
+        paginator = CursorPaginator(queryset, keys=keys)
+        first = list(paginator.page_queryset(None))
+        self.assertTrue(first, "el feed no tiene filas")
+        with self.subTest(page="primera"):
+            self.assertIndexed(paginator.page_queryset(None), sort_ok)
+        with self.subTest(page="cursor"):
+            self.assertIndexed(paginator.page_queryset(paginator.encode(first[0])), sort_ok)
+
+    def test_timeline(self):
+        self.assertPagesIndexed(timelines.home_timeline(self.viewer), keys=("created_at", "tweet_id"))
+
+    def test_explore(self):
+        self.assertPagesIndexed(tweet_cards(viewer=self.viewer))
+
+    def test_profile(self):
+        author = self.tweets[0].user
+        self.assertPagesIndexed(tweet_cards(Tweet.objects.filter(user=author), self.viewer))
+
+    def test_tag(self):
+        self.assertPagesIndexed(hashtags.tagged("django"), keys=("created_at", "tweet_id"))
+
+    def test_list_feed(self):
+        self.assertPagesIndexed(list_feeds.lista_feed(self.lista), keys=("created_at", "tweet_id"))
+
+    def test_notifications(self):
+        self.assertPagesIndexed(Notification.objects.filter(recipient=self.viewer).select_related("actor__userprofile"))
+
+    def test_detalle_coleccion(self):
+        # Se permite ordenar en memoria: la fecha está en core_tweet y no en la
+        # tabla intermedia, así que ningún índice da las filas ya ordenadas. El
+        # plan sí busca por coleccion_id (sin FULL_SCAN), así que solo se ordenan
+        # los tweets de esa colección y no toda la tabla.
+        self.assertPagesIndexed(tweet_cards(self.coleccion.tweets.all(), self.viewer), sort_ok=True)
+
+    def test_hot_lookups(self):
+        viewer, tweet = self.viewer, self.tweets[0]
+        lookups = {
+            "tarjetas por id": (tweet_cards(Tweet.objects.filter(pk__in=[t.pk for t in self.tweets[:3]]), viewer), True),
+            "ya retuiteado": (Tweet.objects.filter(parent=tweet, is_retweet=True, user=viewer).order_by(), False),
+            "notificaciones sin leer": (Notification.objects.filter(recipient=viewer, read=False).order_by(), False),
+            "listas de un miembro": (MiembroDeLista.objects.filter(usuario=tweet.user).values_list("lista_id"), False),
+            "a quién sigue": (Follow.objects.filter(follower=viewer).values_list("following_id"), False),
+            "quién lo sigue": (Follow.objects.filter(following=tweet.user).values_list("follower_id"), False),
+        }
+        for name, (queryset, sort_ok) in lookups.items():
+            with self.subTest(name):
+                self.assertIndexed(queryset, sort_ok)
@@ -0,0 +1,81 @@
+"""
+Timeline materializado (fan-out on write).
+
+Cada vez que se publica un tweet se copia una referencia al timeline de su
+autor y de todos sus seguidores. Así, leer el inicio es un recorrido por el
+índice ``(owner, -created_at)`` de ``TimelineEntry`` en lugar de filtrar
+``Tweet`` por todos los usuarios seguidos.
+"""
+from django.db import connection, transaction
+from django.db.models.constants import OnConflict
+
+from .models import Follow, TimelineEntry, Tweet
+
+BATCH_SIZE = 1000
+
+
+def _entries_for(owner_ids, tweet):
+    return [
+        TimelineEntry(owner_id=owner_id, tweet_id=tweet.pk, author_id=tweet.user_id, created_at=tweet.created_at)
+        for owner_id in owner_ids
+    ]
+
+
+def fan_out(tweet):
+    """Agrega el tweet al timeline de su autor y de sus seguidores."""
+    follower_ids = Follow.objects.filter(following_id=tweet.user_id).values_list('follower_id', flat=True)
+    owner_ids = [tweet.user_id, *follower_ids]
+    TimelineEntry.objects.bulk_create(_entries_for(owner_ids, tweet), batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def copy_tweets(model, owner_column, owner_id, author_filter, params):
+    """
+    ``INSERT ... SELECT`` de los tweets que cumplen ``author_filter`` a la
+    tabla materializada ``model`` (``owner_column`` = ``owner_id``), ignorando
+    los que ya estén. Se hace en la base de datos para no traer cada fila a
+    Python al seguir a alguien o al reconstruir.
+    """
+    ops = connection.ops
+    sql = (
+        f"{ops.insert_statement(on_conflict=OnConflict.IGNORE)} {model._meta.db_table} "
+        f"({owner_column}, tweet_id, author_id, created_at) "
+        f"SELECT %s, id, user_id, created_at FROM {Tweet._meta.db_table} WHERE {author_filter} "
+        f"{ops.on_conflict_suffix_sql([], OnConflict.IGNORE, [], [])}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [owner_id, *params])
+
+
+def _copy_tweets(owner_id, author_filter, params):
+    copy_tweets(TimelineEntry, 'owner_id', owner_id, author_filter, params)
+
+
+def merge_author(owner_id, author_id):
+    """Copia los tweets de ``author_id`` al timeline de ``owner_id`` (al seguir)."""
+    _copy_tweets(owner_id, 'user_id = %s', [author_id])
+
+
+def evict_author(owner_id, author_id):
+    """Quita los tweets de ``author_id`` del timeline de ``owner_id`` (al dejar de seguir)."""
+    TimelineEntry.objects.filter(owner_id=owner_id, author_id=author_id).delete()
+
+
+def backfill(owner_id):
+    """Completa el timeline de un usuario con sus tweets y los de quienes sigue."""
+    _copy_tweets(
+        owner_id,
+        f'user_id = %s OR user_id IN (SELECT following_id FROM {Follow._meta.db_table} WHERE follower_id = %s)',
+        [owner_id, owner_id],
+    )
+
+
+def rebuild(owner_id):
+    """Borra y vuelve a construir el timeline de un usuario."""
+    with transaction.atomic():
+        TimelineEntry.objects.filter(owner_id=owner_id).delete()
+        backfill(owner_id)
+
+
+def home_timeline(user):
+    """Entradas del inicio de ``user``, de la más reciente a la más antigua."""
+    return TimelineEntry.objects.filter(owner=user).order_by('-created_at', '-tweet_id').only('created_at', 'tweet_id')
@@ -10,6 +10,7 @@ urlpatterns = [
     # --- Feed principal ---
     path('', views.timeline, name='timeline'),
     path('explore/', views.explore, name='explore'),
+    path('live/', views.timeline_stream, name='timeline_stream'),
 
     # --- Autenticación / Perfil ---
     path('signup/', views.signup_view, name='signup'),
@@ -25,6 +26,7 @@ urlpatterns = [
     path('listas/yo/', views.my_lists, name='my_lists'),
     path('listas/crear/', views.list_create, name='list_create'),
     path('listas/<int:list_pk>/feed/', views.list_feed, name='list_feed'),
+    path('listas/<int:list_pk>/live/', views.list_stream, name='list_stream'),
     path('listas/<int:list_pk>/miembros/', views.list_members, name='list_members'),
     path('listas/<int:list_pk>/miembros/<int:user_pk>/eliminar/', views.list_remove_member, name='list_remove_member'),
     
@@ -1,22 +1,58 @@
-import re
-from django.contrib.auth import login
+from functools import wraps
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user, login
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404, redirect, render
-from django.http import HttpResponseForbidden, JsonResponse
-from django.db.models import Q
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
 from django.template.loader import render_to_string
-from .models import Tweet, Like, Comment, Follow, UserProfile, Lista, MiembroDeLista, Coleccion
+from django.urls import reverse
+from .models import Tweet, Comment, Follow, Notification, UserProfile, Lista, MiembroDeLista, Coleccion
 from .forms import TweetForm, CommentForm, SignUpForm, ProfileForm, ListaForm, ColeccionForm
-
-HASHTAG_RE = re.compile(r"(#\w+)")
+from . import follows, hashtags, likes, list_feeds, live, timelines
+from . import fragments
+from . import notifications as notifs  # la vista `notifications` ocupa el nombre
+from .cards import acards_for_ids, tweet_cards
+from .search import asearch_tweets
+from .pagination import apaginate, paginate
 
 # --- Función auxiliar ---
-def _create_notification(actor, recipient, verb, tweet=None):
-    if actor == recipient:
-        return
-    from .models import Notification
-    Notification.objects.create(actor=actor, recipient=recipient, verb=verb, tweet=tweet)
+def _render_feed(request, template, context, fragment='components/tweet_feed.html'):
+    """Página completa, o solo el fragmento del feed cuando HTMX pide la siguiente página."""
+    if request.headers.get('HX-Request') and request.GET.get('cursor'):
+        return render(request, fragment, context)
+    return render(request, template, context)
+
+async def _arender_feed(request, template, context, fragment='components/tweet_feed.html'):
+    """``_render_feed`` para vistas async: plantillas y context processors son síncronos (caché, ORM)."""
+    return await sync_to_async(_render_feed)(request, template, context, fragment)
+
+async def _auser(request):
+    """
+    Usuario de la petición sin bloquear el event loop. Queda resuelto en
+    ``request.user`` para que las plantillas no lo vuelvan a buscar.
+    """
+    if not hasattr(request, '_async_user'):
+        # request.auser() existe recién en Django 5.0
+        request._async_user = await (request.auser() if hasattr(request, 'auser') else sync_to_async(get_user)(request))
+        request.user = request._async_user
+    return request._async_user
+
+def alogin_required(view):
+    """``login_required`` para vistas ``async def`` (el de Django las acepta recién en 5.1)."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not (await _auser(request)).is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
 
 # --- Registro de usuario ---
 def signup_view(request):
@@ -30,39 +66,71 @@ def signup_view(request):
     return render(request, 'registration/signup.html', {'form': form})
 
 # --- Timeline principal ---
-@login_required
-def timeline(request):
-    following_ids = list(Follow.objects.filter(follower=request.user).values_list('following_id', flat=True))
-    qs = Tweet.objects.filter(user_id__in=[request.user.id, *following_ids]).select_related('user', 'user__userprofile')
+@alogin_required
+async def timeline(request):
+    user = await _auser(request)
     form = TweetForm(request.POST or None, request.FILES or None)
-    if request.method == 'POST' and form.is_valid():
+    if request.method == 'POST' and await sync_to_async(form.is_valid)():
         tw = form.save(commit=False)
-        tw.user = request.user
-        tw.save()
+        tw.user = user
+        await tw.asave()
         return redirect('timeline')
-    return render(request, 'core/timeline.html', {'tweets': qs, 'form': form})
+    page = await apaginate(request, timelines.home_timeline(user), keys=('created_at', 'tweet_id'))
+    page.object_list = await acards_for_ids([entry.tweet_id for entry in page], user)
+    return await _arender_feed(request, 'core/timeline.html', {'tweets': page, 'form': form, 'live_url': reverse('timeline_stream')})
+
+# --- Timeline en vivo (SSE, solo bajo ASGI) ---
+def _event_stream(request, channels):
+    """Respuesta SSE para ``channels``; con WSGI cada conexión ocuparía un hilo, así que se rechaza."""
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)  # EventSource no reintenta ante un 204
+    response = StreamingHttpResponse(live.stream(channels, get_token(request)), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # que nginx no acumule los eventos
+    return response
+
+async def timeline_stream(request):
+    user = await _auser(request)
+    if not user.is_authenticated:
+        return HttpResponseForbidden()
+    authors = {user.pk, *await sync_to_async(follows.following_ids)(user.pk)}
+    return _event_stream(request, [live.author_channel(pk) for pk in authors])
+
+async def list_stream(request, list_pk):
+    user = await _auser(request)
+    if not user.is_authenticated:
+        return HttpResponseForbidden()
+    try:
+        lista = await Lista.objects.aget(pk=list_pk)
+    except Lista.DoesNotExist:
+        raise Http404
+    if lista.es_privada and lista.creador_id != user.pk:
+        return HttpResponseForbidden("No tienes permiso para ver esta lista privada.")
+    return _event_stream(request, [live.lista_channel(lista.pk)])
 
 # --- Explorar ---
-@login_required
-def explore(request):
-    qs = Tweet.objects.select_related('user', 'user__userprofile').all()[:100]
-    return render(request, 'core/timeline.html', {'tweets': qs, 'form': TweetForm()})
+@alogin_required
+async def explore(request):
+    page = await apaginate(request, tweet_cards(viewer=await _auser(request)))
+    return await _arender_feed(request, 'core/timeline.html', {'tweets': page, 'form': TweetForm()})
 
 # --- BUSCADOR GLOBAL ---
-@login_required
-def search(request):
+@alogin_required
+async def search(request):
+    user = await _auser(request)
     query = request.GET.get('q', '').strip()
     tweets = []
     users = []
 
     if query:
-        tweets = Tweet.objects.filter(
-            Q(content__icontains=query) | Q(user__username__icontains=query)
-        ).select_related('user', 'user__userprofile')[:50]
+        tweets = await asearch_tweets(query, limit=50, viewer=user)
 
-        users = User.objects.filter(username__icontains=query)[:30]
+        users = [u async for u in User.objects.filter(username__icontains=query).select_related('userprofile')[:30]]
+        followed = await sync_to_async(follows.followed_among)(user.pk, [u.pk for u in users])
+        for u in users:
+            u.followed_by_me = u.pk in followed
 
-    return render(request, 'core/search.html', {
+    return await sync_to_async(render)(request, 'core/search.html', {
         'query': query,
         'tweets': tweets,
         'users': users
@@ -71,13 +139,19 @@ def search(request):
 # --- Detalle de tweet ---
 @login_required
 def tweet_detail(request, pk):
-    tw = get_object_or_404(Tweet.objects.select_related('user', 'user__userprofile'), pk=pk)
+    tw = get_object_or_404(tweet_cards(viewer=request.user), pk=pk)
+    if tw.is_retweet and tw.parent_id:
+        # Un retuit no tiene texto ni comentarios propios
+        return redirect(tw.parent.get_absolute_url())
     cform = CommentForm(request.POST or None)
     if request.method == 'POST' and cform.is_valid():
         c = cform.save(commit=False)
         c.user = request.user
         c.tweet = tw
-        c.save()
+        with transaction.atomic():
+            c.save()
+            Tweet.objects.filter(pk=tw.pk).update(comment_count=F('comment_count') + 1)
+        notifs.notify(request.user, tw.user, notifs.COMMENT, tw)
         return redirect(tw.get_absolute_url())
     return render(request, 'core/tweet_detail.html', {'tweet': tw, 'cform': cform})
 
@@ -87,12 +161,13 @@ def profile(request, username):
     user = get_object_or_404(User, username=username)
     profile = get_object_or_404(UserProfile, user=user)
     is_me = request.user == user
-    is_following = Follow.objects.filter(follower=request.user, following=user).exists()
-    tweets = Tweet.objects.filter(user=user)
+    is_following = follows.is_following(request.user.pk, user.pk)
     if request.method == 'POST':
         action = request.POST.get('action')
         if action == 'follow':
-            Follow.objects.get_or_create(follower=request.user, following=user)
+            _, created = Follow.objects.get_or_create(follower=request.user, following=user)
+            if created:
+                notifs.notify(request.user, user, notifs.FOLLOW)
         elif action == 'unfollow':
             Follow.objects.filter(follower=request.user, following=user).delete()
         elif action == 'edit' and is_me:
@@ -101,23 +176,35 @@ def profile(request, username):
                 form.save()
         return redirect('profile', username=username)
     form = ProfileForm(instance=profile) if is_me else None
-    return render(request, 'core/profile.html', {
+    tweets = paginate(request, tweet_cards(Tweet.objects.filter(user=user), request.user))
+    return _render_feed(request, 'core/profile.html', {
         'profile_user': user,
         'profile': profile,
         'is_me': is_me,
         'is_following': is_following,
+        'follow_counts': follows.counts(user.pk),
         'tweets': tweets,
         'form': form
     })
 
 
 # --- NOTIFICACIONES ---
-@login_required
-def notifications(request):
-    """Muestra las notificaciones recibidas por el usuario."""
-    from .models import Notification
-    notificaciones = Notification.objects.filter(recipient=request.user).select_related('actor', 'tweet')
-    return render(request, 'core/notifications.html', {'notificaciones': notificaciones})
+@alogin_required
+async def notifications(request):
+    """Notificaciones recibidas por el usuario, paginadas por cursor. POST las marca como leídas."""
+    user = await _auser(request)
+    if request.method == 'POST':
+        await sync_to_async(notifs.mark_all_read)(user)
+        return redirect('notifications')
+    recibidas = (
+        Notification.objects.filter(recipient=user)
+        .select_related('actor__userprofile')
+        .order_by('-created_at', '-id')
+    )
+    return await _arender_feed(
+        request, 'core/notifications.html', {'notificaciones': await apaginate(request, recibidas)},
+        fragment='components/notification_list.html',
+    )
 
 
 # --- VISTAS DE LISTAS ---
@@ -136,34 +223,39 @@ def list_create(request):
 
 @login_required
 def my_lists(request):
-    listas = Lista.objects.filter(creador=request.user).order_by('-fecha_creacion')
+    listas = Lista.objects.filter(creador=request.user).annotate(num_miembros=Count('miembros')).order_by('-fecha_creacion')
     return render(request, 'core/my_lists.html', {'listas': listas})
 
-@login_required
-def list_feed(request, list_pk):
-    lista = get_object_or_404(Lista, pk=list_pk)
-    if lista.es_privada and lista.creador != request.user:
+@alogin_required
+async def list_feed(request, list_pk):
+    user = await _auser(request)
+    try:
+        lista = await Lista.objects.select_related('creador').annotate(num_miembros=Count('miembros')).aget(pk=list_pk)
+    except Lista.DoesNotExist:
+        raise Http404
+    if lista.es_privada and lista.creador != user:
         return HttpResponseForbidden("No tienes permiso para ver esta lista privada.")
-    miembros = MiembroDeLista.objects.filter(lista=lista).values_list('usuario_id', flat=True)
-    tweets = Tweet.objects.filter(user_id__in=miembros).select_related('user', 'user__userprofile')
-    return render(request, 'core/list_feed.html', {'lista': lista, 'tweets': tweets})
+    page = await apaginate(request, list_feeds.lista_feed(lista), keys=('created_at', 'tweet_id'))
+    page.object_list = await acards_for_ids([entry.tweet_id for entry in page], user)
+    return await _arender_feed(request, 'core/list_feed.html', {'lista': lista, 'tweets': page})
 
 @login_required
 def list_members(request, list_pk):
     lista = get_object_or_404(Lista, pk=list_pk)
     if lista.creador != request.user:
         return HttpResponseForbidden("Solo el creador puede modificar los miembros.")
-    miembros = lista.miembros.all()
+    miembros = MiembroDeLista.objects.filter(lista=lista).select_related('usuario__userprofile')
     if request.method == 'POST':
         user_id = request.POST.get('user_id')
-        action = request.POST.get('action')
+        username = request.POST.get('username')
+        action = request.POST.get('action', 'add')
         try:
-            usuario = User.objects.get(pk=user_id)
+            usuario = User.objects.get(username=username.strip()) if username else User.objects.get(pk=user_id)
             if action == 'add':
                 MiembroDeLista.objects.get_or_create(lista=lista, usuario=usuario)
             elif action == 'remove':
                 MiembroDeLista.objects.filter(lista=lista, usuario=usuario).delete()
-        except User.DoesNotExist:
+        except (User.DoesNotExist, ValueError):
             pass
         return redirect('list_members', list_pk=lista.id)
     return render(request, 'core/list_members.html', {'lista': lista, 'miembros': miembros})
@@ -225,8 +317,8 @@ def crear_coleccion(request):
 @login_required
 def detalle_coleccion(request, pk):
     coleccion = get_object_or_404(Coleccion, pk=pk, usuario=request.user)
-    tweets = coleccion.tweets.select_related('user', 'user__userprofile')
-    return render(request, 'core/coleccion_detalle.html', {'coleccion': coleccion, 'tweets': tweets})
+    tweets = paginate(request, tweet_cards(coleccion.tweets.all(), request.user))
+    return _render_feed(request, 'core/coleccion_detalle.html', {'coleccion': coleccion, 'tweets': tweets})
 
 @login_required
 def eliminar_coleccion(request, pk):
@@ -237,27 +329,33 @@ def eliminar_coleccion(request, pk):
     return render(request, 'core/coleccion_confirm_delete.html', {'coleccion': coleccion})
 
 # --- VISTA DE HASHTAGS ---
-@login_required
-def tag(request, tag):
+@alogin_required
+async def tag(request, tag):
     """Muestra todos los tweets que contienen un hashtag específico."""
+    user = await _auser(request)
     hashtag = f"#{tag}"
-    tweets = Tweet.objects.filter(content__icontains=hashtag).select_related('user', 'user__userprofile')
-    return render(request, 'core/tag.html', {'tag': hashtag, 'tweets': tweets})
+    tweets = await apaginate(request, hashtags.tagged(tag), keys=('created_at', 'tweet_id'))
+    tweets.object_list = await acards_for_ids([entry.tweet_id for entry in tweets], user)
+    return await _arender_feed(request, 'core/tag.html', {'tag': hashtag, 'tweets': tweets})
 
 # --- LIKE / UNLIKE ---
 @login_required
 def like_toggle(request, pk):
-    """Activa o desactiva un 'Me gusta' en un tweet."""
-    tweet = get_object_or_404(Tweet, pk=pk)
-    like, created = Like.objects.get_or_create(user=request.user, tweet=tweet)
-
-    # Si ya existía el "like", lo elimina (toggle off)
-    if not created:
-        like.delete()
-
-    # Si la solicitud viene de HTMX, renderiza solo el botón actualizado
+    """Activa o desactiva un 'Me gusta' en un tweet. El botón manda ``liked`` (1/0) con el estado que quiere."""
+    desired = {'1': True, '0': False}.get(request.POST.get('liked'))
+    try:
+        result = likes.set_like(request.user.pk, pk, desired)
+    except Tweet.DoesNotExist:
+        raise Http404
+    if result.changed:
+        fragments.bump_tweet(pk)
+        if result.liked:
+            notifs.notify(request.user, User(pk=result.author_id), notifs.LIKE, Tweet(pk=pk))
+
+    # Si la solicitud viene de HTMX, renderiza solo el botón actualizado (sin releer el tweet)
     if request.headers.get("HX-Request"):
-        return render(request, "components/like_button.html", {"t": tweet, "user": request.user})
+        t = SimpleNamespace(pk=pk, like_count=result.like_count, liked_by_me=result.liked)
+        return render(request, "components/like_button.html", {"t": t, "user": request.user})
 
     # Si no, recarga la página anterior
     return redirect(request.META.get("HTTP_REFERER", "timeline"))
@@ -265,17 +363,24 @@ def like_toggle(request, pk):
 # --- RETWEET ---
 @login_required
 def retweet(request, pk):
-    """Permite retuitear un tweet existente."""
-    tweet_original = get_object_or_404(Tweet, pk=pk)
-
-    # Evita que el usuario se retuitee a sí mismo varias veces
-    ya_retweeteado = Tweet.objects.filter(user=request.user, content=tweet_original.content).exists()
+    """Permite retuitear un tweet existente: una fila sin texto que apunta al original."""
+    tweet_original = get_object_or_404(Tweet.objects.select_related('user', 'parent__user'), pk=pk)
+    # Retuitear un retuit es retuitear el original
+    if tweet_original.is_retweet and tweet_original.parent_id:
+        tweet_original = tweet_original.parent
+
+    # Evita que el usuario retuitee el mismo tweet varias veces (consulta al índice único)
+    ya_retweeteado = Tweet.objects.filter(parent=tweet_original, is_retweet=True, user=request.user).exists()
     if not ya_retweeteado:
-        Tweet.objects.create(
-            user=request.user,
-            content=tweet_original.content,
-            parent=tweet_original  # opcional, si tu modelo Tweet tiene un campo 'parent'
-        )
+        try:
+            with transaction.atomic():
+                Tweet.objects.create(user=request.user, content='', parent=tweet_original, is_retweet=True)
+                Tweet.objects.filter(pk=tweet_original.pk).update(retweet_count=F('retweet_count') + 1)
+        except IntegrityError:
+            # Doble clic simultáneo: la restricción unique_retweet frena el segundo
+            pass
+        else:
+            notifs.notify(request.user, tweet_original.user, notifs.RETWEET, tweet_original)
 
     return redirect('timeline')
 
@@ -292,6 +397,7 @@ def quote(request, pk):
             nuevo_tweet.user = request.user
             nuevo_tweet.content = f"RT @{original.user.username}: {original.content}\n\n{nuevo_tweet.content}"
             nuevo_tweet.save()
+            notifs.notify(request.user, original.user, notifs.QUOTE, original)
             return redirect('timeline')
     else:
         form = TweetForm()
@@ -322,6 +428,11 @@ def agregar_a_coleccion(request, tweet_id):
 @login_required
 def agregar_a_coleccion_ajax(request):
     """Agrega un tweet a una colección existente mediante HTMX/AJAX."""
+    if request.method == "GET":
+        # El modal de "Guardar en colección" pide las colecciones del usuario
+        colecciones = Coleccion.objects.filter(usuario=request.user).values("id", "nombre")
+        return JsonResponse({"colecciones": list(colecciones)})
+
     tweet_id = request.POST.get("tweet_id")
     coleccion_id = request.POST.get("coleccion_id")
 
@@ -0,0 +1,24 @@
+// Timeline en vivo: los feeds con data-live-url reciben los tweets nuevos por SSE
+document.addEventListener('DOMContentLoaded', () => {
+  const feed = document.querySelector('[data-live-url]');
+  if (!feed || !window.EventSource) return;
+
+  const seen = new Set();
+  const source = new EventSource(feed.dataset.liveUrl);
+
+  source.addEventListener('tweet', (event) => {
+    // Tras una reconexión pueden repetirse eventos: se ignoran por id
+    if (seen.has(event.lastEventId)) return;
+    seen.add(event.lastEventId);
+
+    const tpl = document.createElement('template');
+    tpl.innerHTML = event.data.trim();
+    const card = tpl.content.firstElementChild;
+    if (!card) return;
+    feed.prepend(card);
+    if (window.htmx) htmx.process(card);
+  });
+
+  // Sin soporte (servidor WSGI responde 204) el navegador deja de reintentar solo
+  window.addEventListener('beforeunload', () => source.close());
+});
@@ -1,4 +1,4 @@
 import os
 from django.core.asgi import get_asgi_application
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'twittor.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'twittor_listas.settings')
 application = get_asgi_application()
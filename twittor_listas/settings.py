@@ -1,6 +1,8 @@
 from pathlib import Path
 import os
 
+import django
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'dev-key-change-in-prod'
@@ -18,7 +20,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StickyPrimaryMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -31,7 +36,8 @@ ROOT_URLCONF = 'twittor_listas.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el render (ver core.perf)
+        'BACKEND': 'core.perf.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -40,6 +46,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.unread_notifications',
             ],
         },
     },
@@ -51,7 +58,41 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Conexiones persistentes (segundos). Por defecto 0: bajo ASGI cada
+        # sync_to_async puede caer en otro hilo y las conexiones persistentes se
+        # acumulan sin reusarse. Con WSGI (gunicorn con hilos fijos) conviene 60.
+        'CONN_MAX_AGE': int(os.environ.get('TWITTOR_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+        # Pruebas en un archivo y no en memoria: las de concurrencia (core.tests)
+        # abren una conexión por hilo y necesitan WAL y busy_timeout de verdad
+        'TEST': {'NAME': BASE_DIR / 'db.test.sqlite3'},
+    }
+}
+if django.VERSION >= (5, 1):
+    # Las transacciones toman el lock de escritura al empezar: sin esto, dos que
+    # leen y luego escriben chocan con "database is locked" aunque haya busy_timeout
+    DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+
+# Réplicas de lectura (ver core.routers): TWITTOR_DB_REPLICAS=2 crea replica1 y
+# replica2 en db.replica1.sqlite3, ...; `manage.py sync_replicas` las copia
+TWITTOR_DB_REPLICAS = [f'replica{n}' for n in range(1, int(os.environ.get('TWITTOR_DB_REPLICAS', 0)) + 1)]
+for _alias in TWITTOR_DB_REPLICAS:
+    DATABASES[_alias] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / f'db.{_alias}.sqlite3',
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
     }
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+# Tras una escritura, cuántos segundos lee ese navegador del primario
+TWITTOR_REPLICA_STICKY_SECONDS = 5
+
+# PRAGMA de SQLite por entorno (ver core.sqlite), p. ej. TWITTOR_SQLITE_SYNCHRONOUS=full
+TWITTOR_SQLITE_PRAGMAS = {
+    key[len('TWITTOR_SQLITE_'):].lower(): value
+    for key, value in os.environ.items()
+    if key.startswith('TWITTOR_SQLITE_')
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -73,6 +114,29 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Caché (fragmentos de tarjetas, etc.). LocMem es por proceso: con varios
+# workers en producción conviene Redis o Memcached.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'twittor',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+TWITTOR_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Métricas por petición (ver core.perf): cabecera Server-Timing y log de las
+# peticiones lentas con sus consultas más lentas
+TWITTOR_SERVER_TIMING = DEBUG
+TWITTOR_SLOW_REQUEST_MS = int(os.environ.get('TWITTOR_SLOW_REQUEST_MS', 500))
+TWITTOR_SLOW_REQUEST_TOP_SQL = 5
+
+# Perfilado a pedido (ver core.profiling): cabecera X-Twittor-Profile firmada
+# o una fracción de las peticiones, p. ej. TWITTOR_PROFILE_SAMPLE_RATE=0.01
+TWITTOR_PROFILE_SAMPLE_RATE = float(os.environ.get('TWITTOR_PROFILE_SAMPLE_RATE', 0))
+TWITTOR_PROFILE_DIR = os.environ.get('TWITTOR_PROFILE_DIR', str(BASE_DIR / 'profiles'))
+TWITTOR_PROFILE_KEEP = 200
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_REDIRECT_URL = 'timeline'
@@ -1,4 +1,4 @@
 import os
 from django.core.wsgi import get_wsgi_application
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'twittor.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'twittor_listas.settings')
 application = get_wsgi_application()